@@ -0,0 +1,188 @@
+import base64
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+# OpenAI Import
+from openai import OpenAI, RateLimitError
+
+from apps.bills.concurrency import run_for_bills
+from apps.bills.images import prepare_bill_image
+
+client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=settings.OPENAI_MAX_RETRIES)
+logger = logging.getLogger(__name__)
+
+# Shared cool-down so every worker thread backs off once any of them is rate limited
+_rate_limit_lock = threading.Lock()
+_rate_limited_until = 0.0
+
+ANALYSIS_MODEL = 'gpt-4o'
+
+# Bump whenever INVOICE_SCHEMA or the prompt changes so cached results are not reused
+INVOICE_SCHEMA_VERSION = 1
+
+# JSON Schema for AI extraction
+INVOICE_SCHEMA = {
+    "$schema": "http://json-schema.org/draft/2020-12/schema",
+    "title": "Invoice",
+    "description": "A simple invoice format",
+    "type": "object",
+    "properties": {
+        "invoiceNumber": {"type": "string"},
+        "dateIssued": {"type": "string", "format": "date"},
+        "dueDate": {"type": "string", "format": "date"},
+        "from": {"type": "object", "properties": {"name": {"type": "string"}, "address": {"type": "string"}}},
+        "to": {"type": "object", "properties": {"name": {"type": "string"}, "address": {"type": "string"}}},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string"},
+                    "quantity": {"type": "number"},
+                    "price": {"type": "number"}
+                }
+            }
+        },
+        "total": {"type": "number"},
+        "igst": {"type": "number"},
+        "cgst": {"type": "number"},
+        "sgst": {"type": "number"}
+    }
+}
+
+
+def analyse_bill_file(bill_file, team_id=None, content_hash=None):
+    """
+    Sends the bill image to the model and returns the extracted invoice data.
+
+    When the bill's content hash is known, a previous result for the same file in the
+    same team is reused instead of calling the model again.
+    """
+    cache_key = analysis_cache_key(team_id, content_hash) if team_id and content_hash else None
+    if cache_key:
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            logger.info(f"Reusing cached analysis for file {content_hash}")
+            return cached_data
+
+    image_bytes, mime_type = prepare_bill_image(bill_file)
+    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+
+    response = create_completion(
+        model=ANALYSIS_MODEL,
+        response_format={"type": "json_object"},
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "text",
+                 "text": f"Extract invoice data in JSON format using this schema: {json.dumps(INVOICE_SCHEMA)}"},
+                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{image_base64}"}}
+            ]
+        }],
+        max_tokens=1000
+    )
+    invoice_data = extract_invoice_data(json.loads(response.choices[0].message.content))
+
+    if cache_key:
+        cache.set(cache_key, invoice_data, settings.BILL_ANALYSIS_CACHE_TIMEOUT)
+    return invoice_data
+
+
+def analysis_cache_key(team_id, content_hash):
+    return f"bills:analysis:{team_id}:{content_hash}:v{INVOICE_SCHEMA_VERSION}:{ANALYSIS_MODEL}"
+
+
+def create_completion(**kwargs):
+    """
+    Calls the chat completions API, backing off exponentially (or for the server's
+    Retry-After) when the account is rate limited.
+    """
+    global _rate_limited_until
+
+    for attempt in range(settings.OPENAI_RATE_LIMIT_RETRIES + 1):
+        wait = _rate_limited_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return client.chat.completions.create(**kwargs)
+        except RateLimitError as error:
+            if attempt == settings.OPENAI_RATE_LIMIT_RETRIES:
+                raise
+            delay = _retry_after(error) or min(60, 2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"OpenAI rate limit hit, retrying in {delay:.1f}s (attempt {attempt + 1})")
+            with _rate_limit_lock:
+                _rate_limited_until = max(_rate_limited_until, time.monotonic() + delay)
+
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def analyse_bills_concurrently(analyse, bill_ids, max_workers=None):
+    """
+    Runs the per-bill analyse callable over bill_ids with at most max_workers model calls in flight.
+    """
+    return run_for_bills(analyse, bill_ids, max_workers or settings.BILL_ANALYSIS_CONCURRENCY)
+
+
+def claimable_bills(bills):
+    """
+    Narrows bills to drafts nobody is analysing. A claim older than BILL_ANALYSIS_CLAIM_TIMEOUT
+    counts as abandoned, since a worker killed mid-analysis never releases it.
+    """
+    stale = timezone.now() - datetime.timedelta(seconds=settings.BILL_ANALYSIS_CLAIM_TIMEOUT)
+    return bills.filter(status="Draft").filter(
+        Q(process=False) | Q(analysis_started_at__isnull=True) | Q(analysis_started_at__lt=stale)
+    )
+
+
+def claim_bill(bill_model, bill_id):
+    """
+    Atomically marks a draft bill as being analysed by setting its process flag and claim time.
+    Returns the bill, or None when it is not a draft or another run holds a live claim on it.
+    """
+    bills = claimable_bills(bill_model.objects.filter(id=bill_id))
+    if not bills.update(process=True, analysis_started_at=timezone.now()):
+        return None
+    return bill_model.objects.get(id=bill_id)
+
+
+def release_bill(bill):
+    """
+    Hands a claimed bill back after a failed analysis so it can be analysed again.
+    """
+    type(bill).objects.filter(id=bill.id, status="Draft").update(process=False, analysis_started_at=None)
+
+
+def extract_invoice_data(json_data):
+    """
+    Flattens a schema-shaped model response into plain invoice data.
+    """
+    if "properties" not in json_data:
+        return json_data
+
+    return {
+        "invoiceNumber": json_data["properties"]["invoiceNumber"]["const"],
+        "dateIssued": json_data["properties"]["dateIssued"]["const"],
+        "dueDate": json_data["properties"]["dueDate"]["const"],
+        "from": json_data["properties"]["from"]["properties"],
+        "to": json_data["properties"]["to"]["properties"],
+        "items": [{"description": item["description"]["const"], "quantity": item["quantity"]["const"],
+                   "price": item["price"]["const"]} for item in json_data["properties"]["items"]["items"]],
+        "total": json_data["properties"]["total"]["const"],
+        "igst": json_data["properties"]["igst"]["const"],
+        "cgst": json_data["properties"]["cgst"]["const"],
+        "sgst": json_data["properties"]["sgst"]["const"],
+    }
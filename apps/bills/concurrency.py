@@ -0,0 +1,26 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def run_for_bills(func, bill_ids, max_workers):
+    """
+    Calls func(bill_id) for every bill with at most max_workers calls in flight.
+    Returns the bill ids whose call raised, after logging the error.
+    """
+    def run(bill_id):
+        try:
+            func(bill_id)
+            return None
+        except Exception as error:
+            logger.error(f"{func.__name__} failed for bill {bill_id}: {error}")
+            return bill_id
+        finally:
+            # Each worker thread holds its own database connection
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [bill_id for bill_id in executor.map(run, bill_ids) if bill_id is not None]
@@ -0,0 +1,11 @@
+import hashlib
+
+
+def compute_content_hash(file):
+    """
+    Returns the SHA-256 hex digest of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,95 @@
+import logging
+import mimetypes
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+def prepared_image_name(file_name):
+    """
+    Returns the storage name of the derived image kept next to the original upload.
+    """
+    extension, _ = IMAGE_FORMATS[settings.BILL_IMAGE_FORMAT]
+    root, _ = os.path.splitext(file_name)
+    return f"{root}.prepared.{extension}"
+
+
+def prepare_bill_image(bill_file):
+    """
+    Returns (image_bytes, mime_type) for sending a bill to the model.
+
+    The upload is cropped to its content, downscaled, converted to grayscale and re-encoded.
+    The result is stored next to the original so repeated analysis reads the small copy.
+    Files Pillow cannot read are returned unchanged.
+    """
+    _, mime_type = IMAGE_FORMATS[settings.BILL_IMAGE_FORMAT]
+    derived_name = prepared_image_name(bill_file.name)
+    if default_storage.exists(derived_name):
+        with default_storage.open(derived_name, 'rb') as f:
+            return f.read(), mime_type
+
+    with bill_file.open('rb') as f:
+        original_bytes = f.read()
+
+    try:
+        image_bytes = shrink_image(original_bytes)
+    except (UnidentifiedImageError, OSError) as error:
+        logger.warning(f"Could not pre-process {bill_file.name}, sending the original: {error}")
+        return original_bytes, mimetypes.guess_type(bill_file.name)[0] or 'image/jpeg'
+
+    default_storage.save(derived_name, ContentFile(image_bytes))
+    return image_bytes, mime_type
+
+
+def shrink_image(image_bytes):
+    """
+    Crops margins, downscales to BILL_IMAGE_MAX_SIZE and re-encodes as grayscale.
+    """
+    with Image.open(BytesIO(image_bytes)) as image:
+        image = ImageOps.exif_transpose(image).convert('L')
+
+    image = crop_margins(image)
+    image.thumbnail((settings.BILL_IMAGE_MAX_SIZE, settings.BILL_IMAGE_MAX_SIZE), Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    image.save(output, format=settings.BILL_IMAGE_FORMAT, quality=settings.BILL_IMAGE_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def crop_margins(image, threshold=40, padding=16):
+    """
+    Crops the near-white border around the document content of a grayscale image.
+    """
+    # Pixels noticeably darker than white count as content
+    content = ImageOps.invert(image).point(lambda value: 255 if value > threshold else 0)
+    bbox = content.getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(left - padding, 0),
+        max(top - padding, 0),
+        min(right + padding, image.width),
+        min(bottom + padding, image.height),
+    ))
+
+
+def delete_prepared_image(bill_file):
+    """
+    Removes the derived image of a bill file, if one was created.
+    """
+    derived_name = prepared_image_name(bill_file.name)
+    if default_storage.exists(derived_name):
+        default_storage.delete(derived_name)
@@ -0,0 +1,94 @@
+import base64
+import datetime
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Q
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def paginate_bills(request, bills):
+    """
+    Applies the list filters from the query string and returns one page of bills, newest first.
+
+    Pages are cut with a keyset on (created_at, id) rather than an offset, so every page costs one
+    indexed range scan however deep the user scrolls. Supported parameters: `q` (bill name search),
+    `from` / `to` (created date range, inclusive) and `cursor` (opaque, from the previous page).
+    Returns (page, next_query, filters); next_query is the query string of the following page or None.
+    Malformed dates and cursors are ignored rather than rejected.
+    """
+    filters = {key: request.GET.get(key, '').strip() for key in ('q', 'from', 'to')}
+
+    if filters['q']:
+        bills = bills.filter(billmunshiName__icontains=filters['q'])
+    date_from = _parse_date(filters['from'])
+    if date_from:
+        bills = bills.filter(created_at__gte=_start_of_day(date_from))
+    date_to = _parse_date(filters['to'])
+    if date_to:
+        bills = bills.filter(created_at__lt=_start_of_day(date_to + datetime.timedelta(days=1)))
+
+    cursor = _decode_cursor(request.GET.get('cursor'))
+    if cursor:
+        created_at, bill_id = cursor
+        bills = bills.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=bill_id))
+
+    page_size = settings.BILL_LIST_PAGE_SIZE
+    page = list(bills.order_by('-created_at', '-id')[:page_size + 1])
+
+    next_query = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        last = page[-1]
+        params = {key: value for key, value in filters.items() if value}
+        params['cursor'] = _encode_cursor(last.created_at, last.id)
+        next_query = urlencode(params)
+    return page, next_query, filters
+
+
+def render_bill_list(request, template_name, context, bills_key):
+    """
+    Renders a bill list page with context[bills_key] paginated. htmx requests (filtering and
+    "Load more") only get the `bill-rows` partial of the template; history restores get the full page.
+    """
+    context[bills_key], context['next_query'], context['filters'] = paginate_bills(request, context[bills_key])
+    if request.htmx and not request.htmx.history_restore_request:
+        template_name = f"{template_name}#bill-rows"
+    return render(request, template_name, context)
+
+
+def _start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def _encode_cursor(created_at, bill_id):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{bill_id}".encode()).decode()
+
+
+def _parse_date(value):
+    try:
+        date = parse_date(value) if value else None
+    except ValueError:
+        # Well-formed but impossible, e.g. 2024-02-31
+        return None
+    # The first and last representable years overflow once shifted to a day boundary in UTC
+    if date is None or not datetime.MINYEAR < date.year < datetime.MAXYEAR:
+        return None
+    return date
+
+
+def _decode_cursor(value):
+    if not value:
+        return None
+    try:
+        created_at, bill_id = base64.urlsafe_b64decode(value.encode()).decode().split('|', 1)
+        created_at = parse_datetime(created_at)
+        bill_id = uuid.UUID(bill_id)
+    except ValueError:
+        return None
+    if created_at is None or timezone.is_naive(created_at):
+        return None
+    return created_at, bill_id
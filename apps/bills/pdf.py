@@ -0,0 +1,86 @@
+import tempfile
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+
+def get_pdf_page_count(pdf_bytes):
+    return pdfinfo_from_bytes(pdf_bytes)["Pages"]
+
+
+def split_pdf_pages(pdf_bytes, page_count=None, dpi=None, thread_count=None, chunk_size=None):
+    """
+    Renders every page of a PDF to JPEG and yields (page_number, jpeg_bytes) in page order.
+
+    Pages are rasterized by poppler a chunk at a time straight into a temporary folder, so a
+    long statement costs one render pass per chunk and only one chunk is kept on disk.
+    """
+    page_count = page_count or get_pdf_page_count(pdf_bytes)
+    dpi = dpi or settings.BILL_PDF_DPI
+    thread_count = thread_count or settings.BILL_PDF_THREAD_COUNT
+    chunk_size = chunk_size or settings.BILL_PDF_CHUNK_SIZE
+
+    for first_page in range(1, page_count + 1, chunk_size):
+        last_page = min(first_page + chunk_size - 1, page_count)
+        with tempfile.TemporaryDirectory() as output_folder:
+            page_paths = convert_from_bytes(
+                pdf_bytes,
+                dpi=dpi,
+                fmt='jpeg',
+                first_page=first_page,
+                last_page=last_page,
+                thread_count=thread_count,
+                output_folder=output_folder,
+                paths_only=True,
+            )
+            for page_number, page_path in enumerate(page_paths, start=first_page):
+                with open(page_path, 'rb') as f:
+                    yield page_number, f.read()
+
+
+def save_uploaded_pdf(uploaded_file):
+    """
+    Stores an uploaded multi-invoice PDF so a background task can split it.
+    """
+    return default_storage.save(f"bills/uploads/{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf", uploaded_file)
+
+
+def split_task_id(request):
+    """
+    Returns the PDF split task id passed back to the upload page, or None when it is not a valid task id.
+    """
+    try:
+        return str(uuid.UUID(request.GET.get('task_id', '')))
+    except ValueError:
+        return None
+
+
+def create_page_bills(bill_model, team_id, pdf_path, file_type, progress_recorder=None):
+    """
+    Splits a stored PDF into one bill_model row per page, creating each row as soon as its page
+    is rendered, and removes the stored PDF afterwards. Returns the number of pages.
+    """
+    with default_storage.open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+
+    try:
+        page_count = get_pdf_page_count(pdf_bytes)
+        unique_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        for page_number, page_jpeg in split_pdf_pages(pdf_bytes, page_count=page_count):
+            # Create separate bill for each page
+            bill_model.objects.create(
+                billmunshiName=f"BM-Page-{page_number}-{unique_id}",
+                file=ContentFile(page_jpeg, name=f"BM-Page-{page_number}-{unique_id}.jpg"),
+                fileType=file_type,
+                team_id=team_id
+            )
+            if progress_recorder:
+                progress_recorder.set_progress(page_number, page_count, description=f"Page {page_number} of {page_count}")
+    finally:
+        default_storage.delete(pdf_path)
+
+    return page_count
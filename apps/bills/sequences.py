@@ -0,0 +1,17 @@
+from django.db import transaction
+
+
+def next_bill_number(sequence_model, team_id, prefix):
+    """
+    Returns the next billmunshiName for a team and prefix, e.g. "BM-ZV-42".
+
+    The counter row is locked for the rest of the caller's transaction, so concurrent uploads
+    never receive the same number, and each call costs one indexed lookup however many bills exist.
+    """
+    with transaction.atomic():
+        sequence_model.objects.get_or_create(team_id=team_id, prefix=prefix)
+        sequence = sequence_model.objects.select_for_update().get(team_id=team_id, prefix=prefix)
+        sequence.last_number += 1
+        sequence.save(update_fields=['last_number', 'updated_at'])
+    return f"{prefix}{sequence.last_number}"
+
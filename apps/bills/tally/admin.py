@@ -1,16 +1,21 @@
 from django.contrib import admin
 from apps.bills.tally.models import ParentLedger, Ledger, TallyVendorBill, TallyVendorAnalyzedProduct, \
-    TallyVendorAnalyzedBill, TallyExpenseBill, TallyExpenseAnalyzedBill, TallyExpenseAnalyzedProduct, TallyConfig
+    TallyVendorAnalyzedBill, TallyExpenseBill, TallyExpenseAnalyzedBill, TallyExpenseAnalyzedProduct, TallyConfig, \
+    TallyOutbox, LedgerImport, TallySyncState, TallyBillSequence
 
 # Register your models here.
 
 
 admin.site.register(ParentLedger)
 admin.site.register(Ledger)
+admin.site.register(LedgerImport)
+admin.site.register(TallySyncState)
 admin.site.register(TallyVendorBill)
 admin.site.register(TallyVendorAnalyzedProduct)
 admin.site.register(TallyVendorAnalyzedBill)
 admin.site.register(TallyExpenseBill)
 admin.site.register(TallyExpenseAnalyzedBill)
 admin.site.register(TallyExpenseAnalyzedProduct)
-admin.site.register(TallyConfig)
\ No newline at end of file
+admin.site.register(TallyConfig)
+admin.site.register(TallyOutbox)
+admin.site.register(TallyBillSequence)
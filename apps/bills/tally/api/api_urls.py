@@ -4,7 +4,19 @@ from apps.bills.tally.api import api_views
 
 urlpatterns = [
     path('ledgers', api_views.LedgerViewSet.as_view({'get': 'list', 'post': 'create'}), name='ledgers_api'),
+    path('ledgers/sync-state/', api_views.LedgerSyncStateApi.as_view(), name='ledger_sync_state_api'),
+    path('ledgers/imports/', api_views.LedgerImportApi.as_view(), name='ledger_import_api'),
+    path('ledgers/imports/<uuid:import_id>/', api_views.LedgerImportDetailApi.as_view(),
+         name='ledger_import_detail_api'),
+    path('ledgers/imports/<uuid:import_id>/batches/<int:sequence>/', api_views.LedgerImportBatchApi.as_view(),
+         name='ledger_import_batch_api'),
+    path('ledgers/imports/<uuid:import_id>/commit/', api_views.LedgerImportCommitApi.as_view(),
+         name='ledger_import_commit_api'),
     path('master/', api_views.MasterAPIView.as_view(), name='master_api'),
     path('expense/', api_views.TallyExpenseApi.as_view(), name='expense_api'),
     path('vendor/', api_views.TallyVendor.as_view(), name='vendor_api'),
+    path('expense/ack/', api_views.TallyOutboxAck.as_view(
+        bill_lookup='expense_bill__tallyexpenseanalyzedbill__id__in'), name='expense_ack_api'),
+    path('vendor/ack/', api_views.TallyOutboxAck.as_view(
+        bill_lookup='vendor_bill__tallyvendoranalyzedbill__id__in'), name='vendor_ack_api'),
 ]
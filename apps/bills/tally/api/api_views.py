@@ -1,82 +1,134 @@
-import re
+import json
+import logging
 from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.exceptions import APIException
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from apps.teams.models import Team
-from apps.bills.tally.api.serializers import LedgerSerializer, InvoiceIDSerializer
+from apps.bills.tally.api.pagination import OutboxCursorPagination
+from apps.bills.tally.api.serializers import LedgerSerializer, InvoiceIDSerializer, OutboxAckSerializer
+from apps.bills.tally.ledgers import (
+    LedgerImportError, commit_ledger_import, get_sync_state, ingest_ledgers, ingest_ledger_batch, iter_ndjson
+)
 # Project Imports
 from apps.bills.tally.models import *
 
+logger = logging.getLogger(__name__)
+
 
 class LedgerViewSet(viewsets.ModelViewSet):
-    queryset = Ledger.objects.all()
+    queryset = Ledger.objects.select_related('parent')
     serializer_class = LedgerSerializer
     permission_classes = [AllowAny]
 
     def create(self, request, *args, **kwargs):
-        # Print the full request URL
-        full_url = request.build_absolute_uri()
-        print(f"Full Request URL: {full_url}")
-        match = re.search(r"/org/([^/]+)/bills/", request.path)
-        team = match.group(1) if match else None
+        """
+        Upserts the ledgers pushed by the Tally connector; unchanged ledgers are left alone.
+        """
+        team = get_object_or_404(Team, slug=kwargs.get('team_slug'))
         ledger_data = request.data.get("LEDGER", [])
 
         if not ledger_data:
             return Response({'message': 'No Ledger Data Provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        ledger_instances = []
-        response_data = []
-
         try:
-            with transaction.atomic():
-                for ledger_entry in ledger_data:
-                    parent_name = ledger_entry.get('Parent', '').strip()
-
-                    # Fetch or create ParentLedger
-                    parent_ledger, _ = ParentLedger.objects.get_or_create(parent=parent_name,
-                                                                          team=Team.objects.get(slug=team))
-
-                    # Prepare Ledger instance
-                    ledger_instance = Ledger(
-                        master_id=ledger_entry.get('Master_Id'),
-                        alter_id=ledger_entry.get('Alter_Id'),
-                        name=ledger_entry.get('Name'),
-                        parent=parent_ledger,
-                        alias=ledger_entry.get('ALIAS'),
-                        opening_balance=ledger_entry.get('OpeningBalance', '0'),
-                        gst_in=ledger_entry.get('GSTIN'),
-                        company=ledger_entry.get('Company'),
-                        team=Team.objects.get(slug=team)
-                    )
-                    ledger_instances.append(ledger_instance)
-
-                # Bulk create ledgers for performance
-                created_ledgers = Ledger.objects.bulk_create(ledger_instances)
-
-                # Prepare response data
-                for ledger_instance in created_ledgers:
-                    response_data.append({
-                        'id': ledger_instance.id,
-                        'master_id': ledger_instance.master_id,
-                        'alter_id': ledger_instance.alter_id,
-                        'name': ledger_instance.name,
-                        'parent': ledger_instance.parent.parent,
-                        'alias': ledger_instance.alias,
-                        'opening_balance': ledger_instance.opening_balance,
-                        'gst_in': ledger_instance.gst_in,
-                        'company': ledger_instance.company
-                    })
-
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            created, updated, unchanged = ingest_ledgers(team, ledger_data)
+            return Response({'created': created, 'updated': updated, 'unchanged': unchanged},
+                            status=status.HTTP_201_CREATED)
         except Exception as e:
-            print(e)
+            logger.error(f"Ledger ingestion failed for team {team.slug}: {e}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def ledger_import_data(ledger_import):
+    return {
+        'id': ledger_import.id,
+        'status': ledger_import.status,
+        'last_sequence': ledger_import.last_sequence,
+        'max_alter_id': ledger_import.max_alter_id,
+        'created': ledger_import.created,
+        'updated': ledger_import.updated,
+        'unchanged': ledger_import.unchanged,
+    }
+
+
+class LedgerSyncStateApi(APIView):
+    """
+    Returns the highest ledger AlterID received for the team; the connector exports only ledgers
+    altered after it, with `"Deleted": true` for ledgers removed in Tally.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, team_slug, *args, **kwargs):
+        state = get_sync_state(get_object_or_404(Team, slug=team_slug))
+        return Response({'last_alter_id': state.last_alter_id, 'last_synced_at': state.last_synced_at},
+                        status=status.HTTP_200_OK)
+
+
+class LedgerImportApi(APIView):
+    """
+    Starts a resumable ledger import. The connector then PUTs NDJSON batches numbered from 1 and
+    commits the import; after a dropped connection it reads `last_sequence` and resends from there.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, team_slug, *args, **kwargs):
+        team = get_object_or_404(Team, slug=team_slug)
+        ledger_import = LedgerImport.objects.create(team=team)
+        return Response(ledger_import_data(ledger_import), status=status.HTTP_201_CREATED)
+
+
+class LedgerImportDetailApi(APIView):
+    """
+    Reports how far a ledger import has got.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, team_slug, import_id, *args, **kwargs):
+        ledger_import = get_object_or_404(LedgerImport, id=import_id, team__slug=team_slug)
+        return Response(ledger_import_data(ledger_import), status=status.HTTP_200_OK)
+
+
+class LedgerImportBatchApi(APIView):
+    """
+    Receives one batch of ledgers as NDJSON, optionally gzip-compressed (`Content-Encoding: gzip`).
+    The body is read line by line as it arrives instead of being parsed in one piece.
+    """
+    permission_classes = [AllowAny]
+    parser_classes = []
+
+    def put(self, request, team_slug, import_id, sequence, *args, **kwargs):
+        ledger_import = get_object_or_404(LedgerImport, id=import_id, team__slug=team_slug)
+        gzipped = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+        try:
+            ledger_import = ingest_ledger_batch(ledger_import.id, sequence, iter_ndjson(request.stream, gzipped))
+        except (LedgerImportError, OSError, EOFError) as e:
+            ledger_import.refresh_from_db()
+            return Response({'message': str(e), 'last_sequence': ledger_import.last_sequence},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(ledger_import_data(ledger_import), status=status.HTTP_200_OK)
+
+
+class LedgerImportCommitApi(APIView):
+    """
+    Closes a ledger import and advances the team's AlterID mark; later batches are refused.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, team_slug, import_id, *args, **kwargs):
+        ledger_import = get_object_or_404(LedgerImport.objects.select_related('team'), id=import_id,
+                                          team__slug=team_slug)
+        ledger_import = commit_ledger_import(ledger_import)
+        return Response(ledger_import_data(ledger_import), status=status.HTTP_200_OK)
+
+
 class MasterAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -85,6 +137,42 @@ class MasterAPIView(APIView):
         return Response({'message': 'Incoming Data Received'}, status=status.HTTP_200_OK)
 
 
+def outbox_response(view, request, team_slug, bill_field):
+    """
+    Returns the team's outbox payloads for the given bill type: one cursor page of unacknowledged
+    entries, or with `stream=1` every entry, acknowledged or not, as NDJSON.
+    """
+    entries = TallyOutbox.objects.filter(team__slug=team_slug, **{f'{bill_field}__isnull': False})
+
+    since = request.query_params.get('since')
+    if since:
+        since_time = parse_datetime(since)
+        if since_time is None:
+            return Response({"message": "Invalid since timestamp"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since_time):
+            since_time = timezone.make_aware(since_time)
+        entries = entries.filter(updated_at__gt=since_time)
+
+    if request.query_params.get('stream') in ('1', 'true'):
+        return stream_outbox(entries)
+
+    paginator = OutboxCursorPagination()
+    page = paginator.paginate_queryset(entries.filter(delivered_at__isnull=True).only('id', 'payload', 'updated_at'),
+                                       request, view=view)
+    return paginator.get_paginated_response([entry.payload for entry in page])
+
+
+def stream_outbox(entries):
+    """
+    Streams payloads one JSON document per line, reading the rows in chunks so memory stays flat.
+    """
+    payloads = entries.order_by('updated_at', 'id').values_list('payload', flat=True).iterator(
+        chunk_size=settings.TALLY_EXPORT_CHUNK_SIZE
+    )
+    return StreamingHttpResponse((json.dumps(payload) + '\n' for payload in payloads),
+                                 content_type='application/x-ndjson')
+
+
 class TallyExpenseApi(APIView):
     """
     API View that handles both POST (to receive payload) and GET (to retrieve all synced data with products).
@@ -93,58 +181,14 @@ class TallyExpenseApi(APIView):
 
     def get(self, request, team_slug, *args, **kwargs):
         """
-        Retrieve all synced expense bills with related products.
+        Retrieve synced expense bills the connector has not acknowledged yet, one page at a time.
+        Pass `since` to skip older entries and follow `next` for the rest, or `stream=1` for a full export.
         """
         try:
-            # Get all expenses where the associated TallyExpenseBill status is 'Synced'
-            expenses = TallyExpenseAnalyzedBill.objects.filter(
-                selectBill__status='Synced', selectBill__team__slug=team_slug
-            ).select_related('vendor', 'selectBill')
-
-            data = [
-                {
-                    "id": expense.id,
-                    "voucher": expense.voucher or "N/A",
-                    "bill_no": expense.bill_no or "N/A",
-                    "bill_date": expense.bill_date.strftime('%Y-%m-%d') if expense.bill_date else None,
-                    "total": float(expense.total) if expense.total else 0.0,
-                    "vendor": {
-                        "name": expense.vendor.name if expense.vendor else "No Vendor",
-                        "company": expense.vendor.company if expense.vendor else "No Company",
-                        "gst_in": expense.vendor.gst_in if expense.vendor else "No GST",
-                    },
-                    "taxes": {
-                        "igst": {
-                            "amount": float(expense.igst) if expense.igst else 0.0,
-                            "ledger": str(expense.igst_taxes) if expense.igst_taxes else "No Tax Ledger",
-                        },
-                        "cgst": {
-                            "amount": float(expense.cgst) if expense.cgst else 0.0,
-                            "ledger": str(expense.cgst_taxes) if expense.cgst_taxes else "No Tax Ledger",
-                        },
-                        "sgst": {
-                            "amount": float(expense.sgst) if expense.sgst else 0.0,
-                            "ledger": str(expense.sgst_taxes) if expense.sgst_taxes else "No Tax Ledger",
-                        }
-                    },
-                    "note": expense.note or "No Notes",
-                    "products": [
-                        {
-                            "id": product.id,
-                            "chart_of_accounts": str(
-                                product.chart_of_accounts.name) if product.chart_of_accounts else "No Chart",
-                            "amount": float(product.amount) if product.amount else 0.0,
-                            "debit_or_credit": product.debit_or_credit or "credit",
-                        }
-                        for product in expense.products.all()
-                    ],
-                    "created_at": expense.created_at.strftime('%Y-%m-%d %H:%M:%S') if expense.created_at else None,
-                }
-                for expense in expenses
-            ]
-
-            return Response({"data": data}, status=status.HTTP_200_OK)
+            return outbox_response(self, request, team_slug, 'expense_bill')
 
+        except APIException:
+            raise
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -190,50 +234,14 @@ class TallyVendor(APIView):
 
     def get(self, request, team_slug, *args, **kwargs):
         """
-        Retrieve all synced bills with related product transactions.
+        Retrieve synced vendor bills the connector has not acknowledged yet, one page at a time.
+        Pass `since` to skip older entries and follow `next` for the rest, or `stream=1` for a full export.
         """
         try:
-            # Get all invoices where the associated TallyVendorBill status is 'Synced'
-            vendors = TallyVendorAnalyzedBill.objects.filter(
-                selectBill__status='Synced', selectBill__team__slug=team_slug
-            ).select_related('vendor', 'selectBill')
-
-            data = [
-                {
-                    "id": vendor.id,
-                    "bill_no": vendor.bill_no,
-                    "bill_date": vendor.bill_date.strftime('%Y-%m-%d') if vendor.bill_date else None,
-                    "total": float(vendor.total),
-                    "igst": float(vendor.igst),
-                    "cgst": float(vendor.cgst),
-                    "sgst": float(vendor.sgst),
-                    "vendor": {
-                        "name": vendor.vendor.name if vendor.vendor else "No Vendor",
-                        "company": vendor.vendor.company if vendor.vendor else "No Company",
-                        "gst_in": vendor.vendor.gst_in if vendor.vendor else "No GST",
-                    },
-                    "customer_id": vendor.selectBill.team.id if vendor.selectBill.team else None,
-                    "transactions": [
-                        {
-                            "id": transaction.id,
-                            "item_name": transaction.item_name,
-                            "item_details": transaction.item_details,
-                            "price": float(transaction.price),
-                            "quantity": int(transaction.quantity),
-                            "amount": float(transaction.amount),
-                            "gst": transaction.product_gst,
-                            "igst": float(transaction.igst or 0),
-                            "cgst": float(transaction.cgst or 0),
-                            "sgst": float(transaction.sgst or 0),
-                        }
-                        for transaction in vendor.products.all()
-                    ]
-                }
-                for vendor in vendors
-            ]
-
-            return Response({"data": data}, status=status.HTTP_200_OK)
+            return outbox_response(self, request, team_slug, 'vendor_bill')
 
+        except APIException:
+            raise
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -254,3 +262,23 @@ class TallyVendor(APIView):
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TallyOutboxAck(APIView):
+    """
+    Marks pulled bills as delivered so the connector does not receive them again.
+    Expects {"ids": [...]} with the `id` of each bill entry.
+    """
+    permission_classes = [AllowAny]
+    bill_lookup = None
+
+    def post(self, request, team_slug, *args, **kwargs):
+        serializer = OutboxAckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        acknowledged = TallyOutbox.objects.filter(
+            team__slug=team_slug, delivered_at__isnull=True,
+            **{self.bill_lookup: serializer.validated_data['ids']}
+        ).update(delivered_at=timezone.now())
+        return Response({"acknowledged": acknowledged}, status=status.HTTP_200_OK)
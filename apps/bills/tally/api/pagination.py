@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class OutboxCursorPagination(CursorPagination):
+    """
+    Pages the Tally outbox oldest first, so a connector can resume from the last cursor it received.
+    """
+    ordering = ('updated_at', 'id')
+    page_size = settings.TALLY_PULL_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.TALLY_PULL_MAX_PAGE_SIZE
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'data': data,
+        })
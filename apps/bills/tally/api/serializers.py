@@ -17,3 +17,7 @@ class JournalIDSerializer(serializers.Serializer):
 
 class InvoiceIDSerializer(serializers.Serializer):
     id = serializers.UUIDField()
+
+
+class OutboxAckSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
@@ -1,8 +1,71 @@
 from django import forms
 from django.forms import modelformset_factory, Textarea
 from django.forms import BaseModelFormSet
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from apps.bills.tally.models import TallyVendorBill, TallyVendorAnalyzedProduct, TallyVendorAnalyzedBill, Ledger, \
-    ParentLedger, TallyExpenseBill, TallyExpenseAnalyzedBill, TallyExpenseAnalyzedProduct, TallyConfig
+    TallyExpenseBill, TallyExpenseAnalyzedBill, TallyExpenseAnalyzedProduct, TallyConfig
+
+
+def get_tally_config(team):
+    """
+    Returns the team's TallyConfig, or None when it has not been set up yet.
+    """
+    try:
+        return TallyConfig.objects.get(team=team)
+    except TallyConfig.DoesNotExist:
+        return None
+
+
+def config_ledgers(tally_config, parent_field):
+    """
+    Returns the live ledgers under the parent ledger selected in tally_config.<parent_field>.
+    """
+    if tally_config is None:
+        return Ledger.objects.none()
+    return Ledger.objects.filter(is_deleted=False, parent_id=getattr(tally_config, f"{parent_field}_id"))
+
+
+class SharedLedgerChoices:
+    """
+    Ledger options shared by every form of a formset: the ledgers are read once and each
+    <option> is built once, so a formset of N forms does not repeat N large selects' work.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._options = None
+
+    def apply(self, field):
+        field.queryset = self.queryset
+        field.widget = SharedChoicesSelect(self, attrs=field.widget.attrs)
+
+    def render_options(self, value):
+        if self._options is None:
+            choices = [('', '---------')] + [(str(ledger.pk), str(ledger)) for ledger in self.queryset]
+            self._options = [
+                (key, label, format_html('<option value="{}">{}</option>', key, label)) for key, label in choices
+            ]
+        selected = '' if value is None else str(value)
+        return mark_safe(''.join(
+            format_html('<option value="{}" selected>{}</option>', key, label) if key == selected else option
+            for key, label, option in self._options
+        ))
+
+
+class SharedChoicesSelect(forms.Select):
+    """
+    Select that renders the options of a SharedLedgerChoices.
+    """
+
+    def __init__(self, shared_choices, attrs=None):
+        super().__init__(attrs)
+        self.shared_choices = shared_choices
+
+    def render(self, name, value, attrs=None, renderer=None):
+        final_attrs = self.build_attrs(self.attrs, {**(attrs or {}), 'name': name})
+        return format_html('<select{}>{}</select>', flatatt(final_attrs), self.shared_choices.render_options(value))
 
 
 class TallyVendorBillForm(forms.ModelForm):
@@ -24,19 +87,12 @@ class TallyVendorAnalyzedBillForm(forms.ModelForm):
         team = kwargs.pop('team', None)
         super().__init__(*args, **kwargs)
 
-        # Fetch TallyConfig for the given team
-        try:
-            tally_config = TallyConfig.objects.get(team=team)
-            # Dynamically assign querysets based on the selected ParentLedgers
-            self.fields['vendor'].queryset = Ledger.objects.filter(parent=tally_config.vendor_parent)
-            self.fields['igst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.igst_parent)
-            self.fields['cgst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.cgst_parent)
-            self.fields['sgst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.sgst_parent)
-        except TallyConfig.DoesNotExist:
-            self.fields['vendor'].queryset = Ledger.objects.none()
-            self.fields['igst_taxes'].queryset = Ledger.objects.none()
-            self.fields['cgst_taxes'].queryset = Ledger.objects.none()
-            self.fields['sgst_taxes'].queryset = Ledger.objects.none()
+        # Assign querysets based on the ParentLedgers selected in the team's TallyConfig
+        tally_config = get_tally_config(team)
+        self.fields['vendor'].queryset = config_ledgers(tally_config, 'vendor_parent')
+        self.fields['igst_taxes'].queryset = config_ledgers(tally_config, 'igst_parent')
+        self.fields['cgst_taxes'].queryset = config_ledgers(tally_config, 'cgst_parent')
+        self.fields['sgst_taxes'].queryset = config_ledgers(tally_config, 'sgst_parent')
 
     class Meta:
         model = TallyVendorAnalyzedBill
@@ -53,13 +109,12 @@ class TallyVendorAnalyzedProductForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         team = kwargs.pop('team', None)
+        ledger_choices = kwargs.pop('ledger_choices', None)
         super().__init__(*args, **kwargs)
-        try:
-            tally_config = TallyConfig.objects.get(team=team)
-            # Dynamically assign querysets based on the selected ParentLedgers
-            self.fields['taxes'].queryset = Ledger.objects.filter(parent=tally_config.chart_of_accounts)
-        except ParentLedger.DoesNotExist:
-            self.fields['taxes'].queryset = Ledger.objects.none()
+        # Formsets pass choices shared by all their forms; a standalone form loads its own
+        if ledger_choices is None:
+            ledger_choices = SharedLedgerChoices(config_ledgers(get_tally_config(team), 'chart_of_accounts'))
+        ledger_choices.apply(self.fields['taxes'])
 
     class Meta:
         model = TallyVendorAnalyzedProduct
@@ -69,16 +124,18 @@ class TallyVendorAnalyzedProductForm(forms.ModelForm):
 # ✅
 class BaseTallyVendorProductFormSet(BaseModelFormSet):
     """
-    Custom formset to pass 'team' parameter to each form.
+    Custom formset to pass 'team' and the shared ledger choices to each form.
     """
+    ledger_parent = 'chart_of_accounts'
 
     def __init__(self, *args, **kwargs):
         self.team = kwargs.pop('team', None)
+        self.ledger_choices = SharedLedgerChoices(config_ledgers(get_tally_config(self.team), self.ledger_parent))
         super().__init__(*args, **kwargs)
 
     def get_form_kwargs(self, index):
         kwargs = super().get_form_kwargs(index)
-        kwargs.update({'team': self.team})
+        kwargs.update({'team': self.team, 'ledger_choices': self.ledger_choices})
         return kwargs
 
 
@@ -109,21 +166,12 @@ class ExpenseAnalyzedBillForm(forms.ModelForm):
         team = kwargs.pop('team', None)
         super().__init__(*args, **kwargs)
 
-        # Fetch TallyConfig for the given team
-        try:
-            tally_config = TallyConfig.objects.get(team=team)
-
-            # Dynamically assign querysets based on the selected ParentLedgers
-            self.fields['vendor'].queryset = Ledger.objects.filter(parent=tally_config.vendor_parent)
-            self.fields['igst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.igst_parent)
-            self.fields['cgst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.cgst_parent)
-            self.fields['sgst_taxes'].queryset = Ledger.objects.filter(parent=tally_config.sgst_parent)
-
-        except TallyConfig.DoesNotExist:
-            self.fields['vendor'].queryset = Ledger.objects.none()
-            self.fields['igst_taxes'].queryset = Ledger.objects.none()
-            self.fields['cgst_taxes'].queryset = Ledger.objects.none()
-            self.fields['sgst_taxes'].queryset = Ledger.objects.none()
+        # Assign querysets based on the ParentLedgers selected in the team's TallyConfig
+        tally_config = get_tally_config(team)
+        self.fields['vendor'].queryset = config_ledgers(tally_config, 'vendor_parent')
+        self.fields['igst_taxes'].queryset = config_ledgers(tally_config, 'igst_parent')
+        self.fields['cgst_taxes'].queryset = config_ledgers(tally_config, 'cgst_parent')
+        self.fields['sgst_taxes'].queryset = config_ledgers(tally_config, 'sgst_parent')
 
     class Meta:
         model = TallyExpenseAnalyzedBill
@@ -141,14 +189,12 @@ class ExpenseAnalyzedProductForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         team = kwargs.pop('team', None)
+        ledger_choices = kwargs.pop('ledger_choices', None)
         super().__init__(*args, **kwargs)
-        try:
-            tally_config = TallyConfig.objects.get(team=team)
-            # Dynamically assign querysets based on the selected ParentLedgers
-            self.fields['chart_of_accounts'].queryset = Ledger.objects.filter(
-                parent=tally_config.chart_of_accounts_expense)
-        except ParentLedger.DoesNotExist:
-            self.fields['chart_of_accounts'].queryset = Ledger.objects.none()
+        # Formsets pass choices shared by all their forms; a standalone form loads its own
+        if ledger_choices is None:
+            ledger_choices = SharedLedgerChoices(config_ledgers(get_tally_config(team), 'chart_of_accounts_expense'))
+        ledger_choices.apply(self.fields['chart_of_accounts'])
 
     class Meta:
         model = TallyExpenseAnalyzedProduct
@@ -156,19 +202,11 @@ class ExpenseAnalyzedProductForm(forms.ModelForm):
 
 
 # ✅
-class BaseTallyExpenseProductFormSet(BaseModelFormSet):
+class BaseTallyExpenseProductFormSet(BaseTallyVendorProductFormSet):
     """
-    Custom formset to pass 'team' parameter to each form.
+    Custom formset to pass 'team' and the shared expense ledger choices to each form.
     """
-
-    def __init__(self, *args, **kwargs):
-        self.team = kwargs.pop('team', None)
-        super().__init__(*args, **kwargs)
-
-    def get_form_kwargs(self, index):
-        kwargs = super().get_form_kwargs(index)
-        kwargs.update({'team': self.team})
-        return kwargs
+    ledger_parent = 'chart_of_accounts_expense'
 
 
 ExpenseProductFormSet = forms.modelformset_factory(
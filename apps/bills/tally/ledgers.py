@@ -0,0 +1,243 @@
+import gzip
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.bills.tally.models import ParentLedger, Ledger, LedgerImport, TallySyncState
+
+LEDGER_BATCH_SIZE = 1000
+LEDGER_FIELDS = ['alter_id', 'name', 'parent', 'alias', 'opening_balance', 'gst_in', 'company', 'is_deleted']
+
+
+def ingest_ledgers(team, ledger_data, advance_mark=True):
+    """
+    Upserts ledgers pushed by the Tally connector for one team.
+
+    Ledgers are matched on master_id and only rewritten when Tally's alter_id changed, so a
+    re-push of an unchanged company touches nothing; entries without a Master_Id are matched on
+    their name instead. Entries flagged `Deleted` soft-delete their ledger, since bills may still
+    point at it. Unless advance_mark is False, the team's AlterID high-water mark moves up to the
+    highest Alter_Id received.
+    Returns (created, updated, unchanged) counts; a ledger a concurrent push inserted first counts
+    as unchanged.
+    """
+    # Tally may repeat a ledger in one push; the last copy wins
+    entries = {}
+    for ledger_entry in ledger_data:
+        key = _entry_key(ledger_entry)
+        if key is not None:
+            entries[key] = ledger_entry
+
+    with transaction.atomic():
+        parents = get_or_create_parents(team, {
+            _parent_name(entry) for entry in entries.values() if not _is_deleted(entry.get('Deleted'))
+        })
+        master_ids = [key for key in entries if isinstance(key, str)]
+        names = [key[1] for key in entries if isinstance(key, tuple)]
+        existing = {ledger.master_id: ledger for ledger in Ledger.objects.filter(team=team, master_id__in=master_ids)}
+        existing.update({
+            (None, ledger.name): ledger
+            for ledger in Ledger.objects.filter(team=team, master_id__isnull=True, name__in=names)
+        })
+
+        to_create, to_update, unchanged = [], [], 0
+        for key, ledger_entry in entries.items():
+            ledger = existing.get(key)
+            if _is_deleted(ledger_entry.get('Deleted')):
+                if ledger is None or ledger.is_deleted:
+                    unchanged += 1
+                else:
+                    ledger.is_deleted = True
+                    ledger.alter_id = _as_text(ledger_entry.get('Alter_Id')) or ledger.alter_id
+                    to_update.append(ledger)
+                continue
+
+            values = {
+                'alter_id': _as_text(ledger_entry.get('Alter_Id')),
+                'name': ledger_entry.get('Name'),
+                'parent': parents[_parent_name(ledger_entry)],
+                'alias': ledger_entry.get('ALIAS'),
+                'opening_balance': ledger_entry.get('OpeningBalance', '0'),
+                'gst_in': ledger_entry.get('GSTIN'),
+                'company': ledger_entry.get('Company'),
+                'is_deleted': False,
+            }
+            if ledger is None:
+                to_create.append(Ledger(master_id=_as_text(ledger_entry.get('Master_Id')), team=team, **values))
+            elif _has_changed(ledger, values):
+                for field, value in values.items():
+                    setattr(ledger, field, value)
+                to_update.append(ledger)
+            else:
+                unchanged += 1
+
+        # A push running at the same time may have inserted the same master_id first; its row is kept
+        Ledger.objects.bulk_create(to_create, batch_size=LEDGER_BATCH_SIZE, ignore_conflicts=True)
+        created = _count_inserted(to_create)
+        Ledger.objects.bulk_update(to_update, LEDGER_FIELDS, batch_size=LEDGER_BATCH_SIZE)
+        if advance_mark:
+            advance_alter_id(team, max_alter_id(entries.values()))
+
+    return created, len(to_update), unchanged + len(to_create) - created
+
+
+def get_sync_state(team):
+    state, _ = TallySyncState.objects.get_or_create(team=team, resource='ledgers')
+    return state
+
+
+def advance_alter_id(team, alter_id):
+    """
+    Raises the team's ledger AlterID high-water mark to alter_id; it never moves backwards.
+    """
+    TallySyncState.objects.filter(id=get_sync_state(team).id).update(
+        last_alter_id=Greatest(F('last_alter_id'), alter_id), last_synced_at=timezone.now()
+    )
+
+
+def max_alter_id(ledger_data):
+    alter_ids = [_as_int(ledger_entry.get('Alter_Id')) for ledger_entry in ledger_data]
+    return max(alter_ids, default=0)
+
+
+def get_or_create_parents(team, names):
+    """
+    Returns {name: ParentLedger} for the team, creating the missing parents in one insert.
+    Parents a concurrent push inserted first are read back instead of being duplicated.
+    """
+    parents = {parent.parent: parent for parent in ParentLedger.objects.filter(team=team, parent__in=names)}
+
+    missing = [name for name in names if name not in parents]
+    if missing:
+        ParentLedger.objects.bulk_create([ParentLedger(parent=name, team=team) for name in missing],
+                                         ignore_conflicts=True)
+        parents.update({parent.parent: parent for parent in ParentLedger.objects.filter(team=team, parent__in=missing)})
+    return parents
+
+
+class LedgerImportError(Exception):
+    """
+    Raised when a ledger import batch is rejected; the message is returned to the connector.
+    """
+
+
+def iter_ndjson(stream, gzipped=False):
+    """
+    Yields one ledger entry per non-blank line of an NDJSON stream, decompressing gzip on the fly.
+    """
+    if stream is None:
+        return
+    if gzipped:
+        stream = gzip.GzipFile(fileobj=stream)
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise LedgerImportError(f"Line {line_number} is not valid JSON")
+
+
+def ingest_ledger_batch(ledger_import_id, sequence, entries):
+    """
+    Applies batch number `sequence` of an open import in one transaction, reading entries in chunks.
+
+    A batch that was already applied is acknowledged without being read again, so the connector can
+    resend after a dropped connection. Returns the import.
+    """
+    with transaction.atomic():
+        ledger_import = LedgerImport.objects.select_for_update().select_related('team').get(id=ledger_import_id)
+        if ledger_import.status != 'Open':
+            raise LedgerImportError("This import has already been committed")
+        if sequence <= ledger_import.last_sequence:
+            return ledger_import
+        if sequence != ledger_import.last_sequence + 1:
+            raise LedgerImportError(f"Expected batch {ledger_import.last_sequence + 1}, got {sequence}")
+
+        totals = [0, 0, 0]
+        batch_alter_id = 0
+        while chunk := list(islice(entries, LEDGER_BATCH_SIZE)):
+            counts = ingest_ledgers(ledger_import.team, chunk, advance_mark=False)
+            totals = [total + count for total, count in zip(totals, counts)]
+            batch_alter_id = max(batch_alter_id, max_alter_id(chunk))
+
+        LedgerImport.objects.filter(id=ledger_import.id).update(
+            last_sequence=sequence, created=F('created') + totals[0], updated=F('updated') + totals[1],
+            unchanged=F('unchanged') + totals[2], max_alter_id=Greatest(F('max_alter_id'), batch_alter_id),
+            updated_at=timezone.now()
+        )
+    ledger_import.refresh_from_db()
+    return ledger_import
+
+
+def commit_ledger_import(ledger_import):
+    """
+    Closes an import and only then advances the team's AlterID mark, so an abandoned import
+    is exported again in full next time.
+    """
+    with transaction.atomic():
+        committed = LedgerImport.objects.filter(id=ledger_import.id, status='Open').update(
+            status='Committed', updated_at=timezone.now()
+        )
+        if committed:
+            advance_alter_id(ledger_import.team, ledger_import.max_alter_id)
+    ledger_import.refresh_from_db()
+    return ledger_import
+
+
+def _entry_key(ledger_entry):
+    """
+    Identifies a pushed ledger by its Master_Id, or by its name when Tally sent no Master_Id.
+    Returns None for entries with neither, which cannot be matched and are skipped.
+    """
+    master_id = _as_text(ledger_entry.get('Master_Id'))
+    if master_id:
+        return master_id
+    name = ledger_entry.get('Name')
+    return (None, name) if name else None
+
+
+def _count_inserted(ledgers):
+    """
+    Counts the ledgers bulk_create(ignore_conflicts=True) actually inserted. Ids are set client-side,
+    so a skipped ledger's id is simply not in the table.
+    """
+    ids = [ledger.id for ledger in ledgers]
+    return sum(
+        Ledger.objects.filter(id__in=ids[start:start + LEDGER_BATCH_SIZE]).count()
+        for start in range(0, len(ids), LEDGER_BATCH_SIZE)
+    )
+
+
+def _parent_name(ledger_entry):
+    return (ledger_entry.get('Parent') or '').strip()
+
+
+def _has_changed(ledger, values):
+    if ledger.is_deleted or ledger.alter_id != values['alter_id']:
+        return True
+    if values['alter_id'] is not None:
+        return False
+    # Without an AlterID the only way to tell is to compare the fields themselves
+    return ledger.parent_id != values['parent'].id or any(
+        getattr(ledger, field) != value for field, value in values.items() if field != 'parent'
+    )
+
+
+def _as_text(value):
+    return None if value in (None, '') else str(value)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _is_deleted(value):
+    return value is True or str(value).strip().lower() in ('true', 'yes', '1')
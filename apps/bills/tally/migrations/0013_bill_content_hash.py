@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0012_tallyvendoranalyzedbill_gst_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tallyexpensebill',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='tallyvendorbill',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-18 06:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0013_bill_content_hash'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyOutbox',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expense_bill', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tally_outbox', to='tally.tallyexpensebill')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+                ('vendor_bill', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tally_outbox', to='tally.tallyvendorbill')),
+            ],
+            options={
+                'verbose_name_plural': 'Tally Outbox',
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.1.5 on 2026-10-18 06:12
+from django.db import migrations
+
+
+# Frozen copies of the payload builders in apps.bills.tally.sync as they were when this migration
+# was written; they only touch fields of the historical models, so later changes cannot affect it.
+def _ledger_name(ledger):
+    return ledger.name if ledger else "No Tax Ledger"
+
+
+def _vendor_details(vendor):
+    return {
+        "name": vendor.name if vendor else "No Vendor",
+        "company": vendor.company if vendor else "No Company",
+        "gst_in": vendor.gst_in if vendor else "No GST",
+    }
+
+
+def build_vendor_bill_payload(analysed_bill):
+    return {
+        "id": str(analysed_bill.id),
+        "bill_no": analysed_bill.bill_no,
+        "bill_date": analysed_bill.bill_date.strftime('%Y-%m-%d') if analysed_bill.bill_date else None,
+        "total": float(analysed_bill.total),
+        "igst": float(analysed_bill.igst),
+        "cgst": float(analysed_bill.cgst),
+        "sgst": float(analysed_bill.sgst),
+        "vendor": _vendor_details(analysed_bill.vendor),
+        "customer_id": analysed_bill.selectBill.team_id,
+        "transactions": [
+            {
+                "id": str(product.id),
+                "item_name": product.item_name,
+                "item_details": product.item_details,
+                "price": float(product.price),
+                "quantity": int(product.quantity),
+                "amount": float(product.amount),
+                "gst": product.product_gst,
+                "igst": float(product.igst or 0),
+                "cgst": float(product.cgst or 0),
+                "sgst": float(product.sgst or 0),
+            }
+            for product in analysed_bill.products.all()
+        ]
+    }
+
+
+def build_expense_bill_payload(analysed_bill):
+    return {
+        "id": str(analysed_bill.id),
+        "voucher": analysed_bill.voucher or "N/A",
+        "bill_no": analysed_bill.bill_no or "N/A",
+        "bill_date": analysed_bill.bill_date.strftime('%Y-%m-%d') if analysed_bill.bill_date else None,
+        "total": float(analysed_bill.total) if analysed_bill.total else 0.0,
+        "vendor": _vendor_details(analysed_bill.vendor),
+        "taxes": {
+            "igst": {
+                "amount": float(analysed_bill.igst) if analysed_bill.igst else 0.0,
+                "ledger": _ledger_name(analysed_bill.igst_taxes),
+            },
+            "cgst": {
+                "amount": float(analysed_bill.cgst) if analysed_bill.cgst else 0.0,
+                "ledger": _ledger_name(analysed_bill.cgst_taxes),
+            },
+            "sgst": {
+                "amount": float(analysed_bill.sgst) if analysed_bill.sgst else 0.0,
+                "ledger": _ledger_name(analysed_bill.sgst_taxes),
+            }
+        },
+        "note": analysed_bill.note or "No Notes",
+        "products": [
+            {
+                "id": str(product.id),
+                "chart_of_accounts": product.chart_of_accounts.name if product.chart_of_accounts else "No Chart",
+                "amount": float(product.amount) if product.amount else 0.0,
+                "debit_or_credit": product.debit_or_credit or "credit",
+            }
+            for product in analysed_bill.products.all()
+        ],
+        "created_at": analysed_bill.created_at.strftime('%Y-%m-%d %H:%M:%S') if analysed_bill.created_at else None,
+    }
+
+
+def backfill_outbox(apps, schema_editor):
+    """
+    Queues the bills that were already Synced, so the connector keeps seeing them after the switch.
+    """
+    TallyOutbox = apps.get_model('tally', 'TallyOutbox')
+    TallyVendorAnalyzedBill = apps.get_model('tally', 'TallyVendorAnalyzedBill')
+    TallyExpenseAnalyzedBill = apps.get_model('tally', 'TallyExpenseAnalyzedBill')
+
+    vendor_bills = TallyVendorAnalyzedBill.objects.filter(selectBill__status='Synced').select_related(
+        'selectBill', 'vendor'
+    ).prefetch_related('products')
+    for analysed_bill in vendor_bills:
+        TallyOutbox.objects.get_or_create(vendor_bill=analysed_bill.selectBill,
+                                          defaults={'team_id': analysed_bill.selectBill.team_id,
+                                                    'payload': build_vendor_bill_payload(analysed_bill)})
+
+    expense_bills = TallyExpenseAnalyzedBill.objects.filter(selectBill__status='Synced').select_related(
+        'selectBill', 'vendor', 'igst_taxes', 'cgst_taxes', 'sgst_taxes'
+    ).prefetch_related('products__chart_of_accounts')
+    for analysed_bill in expense_bills:
+        TallyOutbox.objects.get_or_create(expense_bill=analysed_bill.selectBill,
+                                          defaults={'team_id': analysed_bill.selectBill.team_id,
+                                                    'payload': build_expense_bill_payload(analysed_bill)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0014_tallyoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_outbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0015_backfill_tally_outbox'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tallyoutbox',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tallyoutbox',
+            index=models.Index(fields=['team', 'updated_at', 'id'], name='tally_outbox_pull_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 07:20
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0016_tallyoutbox_delivered_at'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerImport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('status', models.CharField(choices=[('Open', 'Open'), ('Committed', 'Committed')], default='Open', max_length=10)),
+                ('last_sequence', models.PositiveIntegerField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('unchanged', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+            ],
+            options={
+                'verbose_name_plural': 'Ledger Imports',
+            },
+        ),
+    ]
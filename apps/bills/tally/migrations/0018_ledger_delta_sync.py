@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-18 07:55
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0017_ledgerimport'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledger',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='ledgerimport',
+            name='max_alter_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TallySyncState',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('resource', models.CharField(choices=[('ledgers', 'Ledgers')], max_length=50)),
+                ('last_alter_id', models.PositiveBigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+            ],
+            options={
+                'verbose_name_plural': 'Tally Sync States',
+                'constraints': [models.UniqueConstraint(fields=('team', 'resource'), name='unique_tally_sync_state_per_team')],
+            },
+        ),
+    ]
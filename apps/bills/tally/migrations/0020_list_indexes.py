@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0019_billsequence'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['team', 'parent', 'name'], name='tally_ledger_parent_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['team', 'master_id'], name='tally_ledger_master_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tallyexpensebill',
+            index=models.Index(fields=['team', 'status', '-created_at'], name='tally_expensebill_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tallyvendorbill',
+            index=models.Index(fields=['team', 'status', '-created_at'], name='tally_vendorbill_list_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:10
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_ledgers(apps, schema_editor):
+    """
+    Removes the duplicate ledgers earlier pushes created for the same team and master_id, so the
+    unique constraint can be added. The most recently updated copy is kept and everything that
+    pointed at a duplicate is moved to it first, since those foreign keys cascade on delete.
+    """
+    Ledger = apps.get_model('tally', 'Ledger')
+    Ledger.objects.filter(master_id='').update(master_id=None)
+
+    references = [
+        (relation.related_model, relation.field.name)
+        for relation in Ledger._meta.related_objects if relation.one_to_many
+    ]
+    duplicated = Ledger.objects.filter(master_id__isnull=False).values('team_id', 'master_id').annotate(
+        copies=Count('id')
+    ).filter(copies__gt=1)
+    for group in duplicated.iterator():
+        ledger_ids = list(Ledger.objects.filter(team_id=group['team_id'], master_id=group['master_id']).order_by(
+            '-updated_at', '-id'
+        ).values_list('id', flat=True))
+        keep, duplicates = ledger_ids[0], ledger_ids[1:]
+        for model, field_name in references:
+            model.objects.filter(**{f'{field_name}__in': duplicates}).update(**{field_name: keep})
+        Ledger.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0020_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0021_dedupe_ledgers'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('master_id__isnull', False)), fields=('team', 'master_id'), name='unique_tally_ledger_master_id_per_team'),
+        ),
+    ]
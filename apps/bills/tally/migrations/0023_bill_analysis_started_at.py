@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0022_ledger_unique_master_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tallyexpensebill',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tallyvendorbill',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
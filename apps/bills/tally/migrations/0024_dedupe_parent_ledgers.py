@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:50
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_parent_ledgers(apps, schema_editor):
+    """
+    Merges the parent ledgers concurrent pushes created twice for the same team and name, so the
+    unique constraint can be added. The oldest copy is kept and everything that pointed at a
+    duplicate is moved to it first, since ledgers cascade on delete.
+    """
+    ParentLedger = apps.get_model('tally', 'ParentLedger')
+
+    references = [
+        (relation.related_model, relation.field.name)
+        for relation in ParentLedger._meta.related_objects if relation.one_to_many
+    ]
+    duplicated = ParentLedger.objects.filter(parent__isnull=False).values('team_id', 'parent').annotate(
+        copies=Count('id')
+    ).filter(copies__gt=1)
+    for group in duplicated.iterator():
+        parent_ids = list(ParentLedger.objects.filter(team_id=group['team_id'], parent=group['parent']).order_by(
+            'created_at', 'id'
+        ).values_list('id', flat=True))
+        keep, duplicates = parent_ids[0], parent_ids[1:]
+        for model, field_name in references:
+            model.objects.filter(**{f'{field_name}__in': duplicates}).update(**{field_name: keep})
+        ParentLedger.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0023_bill_analysis_started_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_parent_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tally', '0024_dedupe_parent_ledgers'),
+        ('teams', '0003_alter_membership_unique_together_flag'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='parentledger',
+            constraint=models.UniqueConstraint(fields=('team', 'parent'), name='unique_tally_parent_ledger_per_team'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
-import re
 from django.db import models
+from apps.bills.files import compute_content_hash
+from apps.bills.sequences import next_bill_number
 from apps.teams.models import BaseTeamModel
 
 
@@ -11,6 +12,11 @@ class ParentLedger(BaseTeamModel):
     created_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'parent'], name='unique_tally_parent_ledger_per_team')
+        ]
+
     def __str__(self):
         return f"{self.parent}"
 
@@ -25,6 +31,7 @@ class Ledger(BaseTeamModel):
     opening_balance = models.CharField(max_length=255, blank=True, null=True)
     gst_in = models.CharField(max_length=255, blank=True, null=True)
     company = models.CharField(max_length=255, blank=True, null=True)
+    is_deleted = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.name}"
@@ -32,6 +39,66 @@ class Ledger(BaseTeamModel):
     class Meta:
         verbose_name = 'Ledger'
         verbose_name_plural = 'Ledgers'
+        indexes = [
+            models.Index(fields=['team', 'parent', 'name'], name='tally_ledger_parent_name_idx'),
+            models.Index(fields=['team', 'master_id'], name='tally_ledger_master_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'master_id'], condition=models.Q(master_id__isnull=False),
+                                    name='unique_tally_ledger_master_id_per_team')
+        ]
+
+
+class TallySyncState(BaseTeamModel):
+    """
+    Tracks the highest Tally AlterID received for each master list of a team, so the connector
+    only exports what was altered since.
+    """
+    RESOURCE_CHOICES = (
+        ('ledgers', 'Ledgers'),
+    )
+
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    resource = models.CharField(choices=RESOURCE_CHOICES, max_length=50)
+    last_alter_id = models.PositiveBigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.team} - {self.resource}"
+
+    class Meta:
+        verbose_name_plural = "Tally Sync States"
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'resource'], name='unique_tally_sync_state_per_team')
+        ]
+
+
+class LedgerImport(BaseTeamModel):
+    """
+    A resumable ledger upload from the Tally connector, received as numbered batches.
+    """
+    STATUS_CHOICES = (
+        ('Open', 'Open'),
+        ('Committed', 'Committed'),
+    )
+
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Open')
+    last_sequence = models.PositiveIntegerField(default=0)
+    max_alter_id = models.PositiveBigIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Ledger Imports'
+
+    def __str__(self):
+        return f"{self.status} ledger import ({self.last_sequence} batches)"
 
 
 class TallyConfig(BaseTeamModel):
@@ -62,6 +129,27 @@ class TallyConfig(BaseTeamModel):
         return f"Tally Config for Team {self.team.name}"
 
 
+##### Bill Number Sequence
+class TallyBillSequence(BaseTeamModel):
+    """
+    Holds the last bill number handed out per team and prefix; see next_bill_number.
+    """
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    prefix = models.CharField(max_length=20)
+    last_number = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.team} - {self.prefix}{self.last_number}"
+
+    class Meta:
+        verbose_name_plural = "Tally Bill Sequences"
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'prefix'], name='unique_tally_bill_sequence_per_team')
+        ]
+
+
 ##### File Validator
 def validate_file_extension(value):
     """
@@ -96,13 +184,19 @@ class TallyVendorBill(BaseTeamModel):
     file = models.FileField(upload_to='bills/', validators=[validate_file_extension])
     fileType = models.CharField(choices=BILL_TYPE, max_length=100, null=True, blank=True, default="Single Invoice/File")
     analysed_data = models.JSONField(default=dict, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
     status = models.CharField(max_length=10, choices=BILL_STATUS, default='Draft', blank=True)
     process = models.BooleanField(default=False)
+    analysis_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Fixed typo: update_at -> updated_at
 
     class Meta:
         verbose_name_plural = 'Tally Vendor Bills'
+        indexes = [
+            # Bill lists filter on team and status, newest first
+            models.Index(fields=['team', 'status', '-created_at'], name='tally_vendorbill_list_idx'),
+        ]
 
     def __str__(self):
         return self.billmunshiName if self.billmunshiName else "Unnamed Bill"
@@ -112,15 +206,11 @@ class TallyVendorBill(BaseTeamModel):
         Automatically generates a unique billmunshiName if not provided.
         """
         if not self.billmunshiName:
-            highest_bill = TallyVendorBill.objects.filter(billmunshiName__startswith='BM-TB-').order_by(
-                '-billmunshiName').first()
-            if highest_bill:
-                match = re.match(r'BM-TB-(\d+)', highest_bill.billmunshiName)
-                next_number = int(match.group(1)) + 1 if match else 1
-            else:
-                next_number = 1
+            self.billmunshiName = next_bill_number(TallyBillSequence, self.team_id, 'BM-TB-')
 
-            self.billmunshiName = f'BM-TB-{next_number}'
+        # Hash the uploaded file once so identical invoices can reuse earlier analysis
+        if self._state.adding and self.file and not self.content_hash:
+            self.content_hash = compute_content_hash(self.file)
 
         super().save(*args, **kwargs)
 
@@ -228,13 +318,19 @@ class TallyExpenseBill(BaseTeamModel):
     file = models.FileField(upload_to='bills/', validators=[validate_file_extension])
     fileType = models.CharField(choices=BILL_TYPE, max_length=100, null=True, blank=True, default="Single Invoice/File")
     analysed_data = models.JSONField(default=dict, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
     status = models.CharField(max_length=10, choices=BILL_STATUS, default='Draft', blank=True)
     process = models.BooleanField(default=False)
+    analysis_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Fixed typo: update_at -> updated_at
 
     class Meta:
         verbose_name_plural = 'Tally Expense Bills'
+        indexes = [
+            # Bill lists filter on team and status, newest first
+            models.Index(fields=['team', 'status', '-created_at'], name='tally_expensebill_list_idx'),
+        ]
 
     def __str__(self):
         return self.billmunshiName if self.billmunshiName else "Unnamed Bill"
@@ -244,15 +340,11 @@ class TallyExpenseBill(BaseTeamModel):
         Automatically generates a unique billmunshiName if not provided.
         """
         if not self.billmunshiName:
-            highest_bill = TallyExpenseBill.objects.filter(billmunshiName__startswith='BM-TB-').order_by(
-                '-billmunshiName').first()
-            if highest_bill:
-                match = re.match(r'BM-TE-(\d+)', highest_bill.billmunshiName)
-                next_number = int(match.group(1)) + 1 if match else 1
-            else:
-                next_number = 1
+            self.billmunshiName = next_bill_number(TallyBillSequence, self.team_id, 'BM-TE-')
 
-            self.billmunshiName = f'BM-TE-{next_number}'
+        # Hash the uploaded file once so identical invoices can reuse earlier analysis
+        if self._state.adding and self.file and not self.content_hash:
+            self.content_hash = compute_content_hash(self.file)
 
         super().save(*args, **kwargs)
 
@@ -306,3 +398,30 @@ class TallyExpenseAnalyzedProduct(BaseTeamModel):
 
     def __str__(self):
         return self.expense_bill.selectBill.billmunshiName
+
+
+#### Tally Outbox
+class TallyOutbox(BaseTeamModel):
+    """
+    Holds the payload of each synced bill until the Tally connector pulls it.
+    """
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    vendor_bill = models.OneToOneField(TallyVendorBill, on_delete=models.CASCADE, null=True, blank=True,
+                                       related_name='tally_outbox')
+    expense_bill = models.OneToOneField(TallyExpenseBill, on_delete=models.CASCADE, null=True, blank=True,
+                                        related_name='tally_outbox')
+    payload = models.JSONField(default=dict)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Tally Outbox"
+        indexes = [
+            # Serves the connector's cursor pages
+            models.Index(fields=['team', 'updated_at', 'id'], name='tally_outbox_pull_idx'),
+        ]
+
+    def __str__(self):
+        bill = self.vendor_bill or self.expense_bill
+        return bill.billmunshiName if bill else "Unnamed Bill"
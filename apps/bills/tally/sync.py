@@ -0,0 +1,140 @@
+from django.db import transaction
+
+from apps.bills.tally.models import TallyVendorAnalyzedBill, TallyExpenseAnalyzedBill, TallyOutbox
+
+
+class TallySyncError(Exception):
+    """
+    Raised when a bill cannot be queued for Tally; the message is shown to the user.
+    """
+
+
+def get_vendor_bill_for_sync(bill_id):
+    """
+    Loads an analyzed vendor bill with its ledgers and products in two queries.
+    """
+    return TallyVendorAnalyzedBill.objects.select_related(
+        'selectBill', 'vendor', 'igst_taxes', 'cgst_taxes', 'sgst_taxes'
+    ).prefetch_related('products').get(selectBill=bill_id)
+
+
+def get_expense_bill_for_sync(bill_id):
+    """
+    Loads an analyzed expense bill with its ledgers and products' accounts in two queries.
+    """
+    return TallyExpenseAnalyzedBill.objects.select_related(
+        'selectBill', 'vendor', 'igst_taxes', 'cgst_taxes', 'sgst_taxes'
+    ).prefetch_related('products__chart_of_accounts').get(selectBill=bill_id)
+
+
+def _ledger_name(ledger):
+    return ledger.name if ledger else "No Tax Ledger"
+
+
+def build_vendor_bill_payload(analysed_bill):
+    """
+    Builds the vendor bill entry the Tally connector reads from the vendor API.
+    """
+    vendor = analysed_bill.vendor
+    return {
+        "id": str(analysed_bill.id),
+        "bill_no": analysed_bill.bill_no,
+        "bill_date": analysed_bill.bill_date.strftime('%Y-%m-%d') if analysed_bill.bill_date else None,
+        "total": float(analysed_bill.total),
+        "igst": float(analysed_bill.igst),
+        "cgst": float(analysed_bill.cgst),
+        "sgst": float(analysed_bill.sgst),
+        "vendor": {
+            "name": vendor.name if vendor else "No Vendor",
+            "company": vendor.company if vendor else "No Company",
+            "gst_in": vendor.gst_in if vendor else "No GST",
+        },
+        "customer_id": analysed_bill.selectBill.team_id,
+        "transactions": [
+            {
+                "id": str(product.id),
+                "item_name": product.item_name,
+                "item_details": product.item_details,
+                "price": float(product.price),
+                "quantity": int(product.quantity),
+                "amount": float(product.amount),
+                "gst": product.product_gst,
+                "igst": float(product.igst or 0),
+                "cgst": float(product.cgst or 0),
+                "sgst": float(product.sgst or 0),
+            }
+            for product in analysed_bill.products.all()
+        ]
+    }
+
+
+def build_expense_bill_payload(analysed_bill):
+    """
+    Builds the expense bill entry the Tally connector reads from the expense API.
+    """
+    vendor = analysed_bill.vendor
+    return {
+        "id": str(analysed_bill.id),
+        "voucher": analysed_bill.voucher or "N/A",
+        "bill_no": analysed_bill.bill_no or "N/A",
+        "bill_date": analysed_bill.bill_date.strftime('%Y-%m-%d') if analysed_bill.bill_date else None,
+        "total": float(analysed_bill.total) if analysed_bill.total else 0.0,
+        "vendor": {
+            "name": vendor.name if vendor else "No Vendor",
+            "company": vendor.company if vendor else "No Company",
+            "gst_in": vendor.gst_in if vendor else "No GST",
+        },
+        "taxes": {
+            "igst": {
+                "amount": float(analysed_bill.igst) if analysed_bill.igst else 0.0,
+                "ledger": _ledger_name(analysed_bill.igst_taxes),
+            },
+            "cgst": {
+                "amount": float(analysed_bill.cgst) if analysed_bill.cgst else 0.0,
+                "ledger": _ledger_name(analysed_bill.cgst_taxes),
+            },
+            "sgst": {
+                "amount": float(analysed_bill.sgst) if analysed_bill.sgst else 0.0,
+                "ledger": _ledger_name(analysed_bill.sgst_taxes),
+            }
+        },
+        "note": analysed_bill.note or "No Notes",
+        "products": [
+            {
+                "id": str(product.id),
+                "chart_of_accounts": product.chart_of_accounts.name if product.chart_of_accounts else "No Chart",
+                "amount": float(product.amount) if product.amount else 0.0,
+                "debit_or_credit": product.debit_or_credit or "credit",
+            }
+            for product in analysed_bill.products.all()
+        ],
+        "created_at": analysed_bill.created_at.strftime('%Y-%m-%d %H:%M:%S') if analysed_bill.created_at else None,
+    }
+
+
+def queue_vendor_bill(bill_id):
+    """
+    Writes a vendor bill to the Tally outbox and marks it Synced.
+    """
+    analysed_bill = get_vendor_bill_for_sync(bill_id)
+    if not analysed_bill.bill_no:
+        raise TallySyncError("Missing required field: bill_number")
+    _queue_bill(analysed_bill, 'vendor_bill', build_vendor_bill_payload(analysed_bill))
+
+
+def queue_expense_bill(bill_id):
+    """
+    Writes an expense bill to the Tally outbox and marks it Synced.
+    """
+    analysed_bill = get_expense_bill_for_sync(bill_id)
+    _queue_bill(analysed_bill, 'expense_bill', build_expense_bill_payload(analysed_bill))
+
+
+def _queue_bill(analysed_bill, outbox_field, payload):
+    bill = analysed_bill.selectBill
+    with transaction.atomic():
+        TallyOutbox.objects.update_or_create(
+            **{outbox_field: bill}, defaults={'team_id': bill.team_id, 'payload': payload, 'delivered_at': None}
+        )
+        bill.status = "Synced"
+        bill.save(update_fields=['status', 'updated_at'])
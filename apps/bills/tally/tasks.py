@@ -0,0 +1,229 @@
+import logging
+from datetime import datetime
+
+from celery import shared_task
+from celery_progress.backend import ProgressRecorder
+from django.db import transaction
+
+from apps.bills.analysis import (
+    analyse_bill_file, analyse_bills_concurrently, claim_bill, claimable_bills, release_bill
+)
+from apps.bills.pdf import create_page_bills
+from apps.bills.tally.models import (
+    ParentLedger, Ledger, TallyVendorBill, TallyVendorAnalyzedBill, TallyVendorAnalyzedProduct,
+    TallyExpenseBill, TallyExpenseAnalyzedBill, TallyExpenseAnalyzedProduct
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def analyse_vendor_bill(bill_id):
+    """
+    Analyzes a draft Tally vendor bill using AI and creates its analyzed bill and products.
+    """
+    # Claim the bill before the slow model call so overlapping runs skip it
+    bill = claim_bill(TallyVendorBill, bill_id)
+    if bill is None:
+        logger.info(f"Tally vendor bill {bill_id} is not a draft or is already being analysed, skipping")
+        return
+
+    # AI Processing Request
+    try:
+        relevant_data = analyse_bill_file(bill.file, team_id=bill.team_id, content_hash=bill.content_hash)
+    except Exception as error:
+        logger.error(f"AI processing failed for Tally vendor bill {bill_id}: {error}")
+        release_bill(bill)
+        return
+
+    # Save extracted data to the bill object
+    bill.analysed_data = relevant_data
+    bill.save(update_fields=['analysed_data'])
+
+    # Extract required fields safely
+    try:
+        invoice_number = relevant_data.get('invoiceNumber', '').strip()
+        date_issued = relevant_data.get('dateIssued', '')
+        company_name = relevant_data.get('from', {}).get('name', '').strip().lower()
+
+        date_issued = datetime.strptime(date_issued, '%Y-%m-%d').date() if date_issued else None
+
+        try:
+            parent_ledger = ParentLedger.objects.get(parent="Sundry Creditors", team=bill.team)
+            vendor_list = Ledger.objects.filter(parent=parent_ledger, team=bill.team, is_deleted=False)
+
+            # Find the matching vendor in vendor_list (Case-Insensitive Exact Match)
+            vendor = vendor_list.filter(name__iexact=company_name).first()
+            if not vendor:
+                vendor = vendor_list.filter(name__icontains=company_name).first()
+        except ParentLedger.DoesNotExist:
+            vendor = None
+
+        # Determine GST Type
+        igst_val = float(relevant_data.get('igst') or 0)
+        cgst_val = float(relevant_data.get('cgst') or 0)
+        sgst_val = float(relevant_data.get('sgst') or 0)
+
+        if igst_val > 0:
+            gst_type = "Inter-State"
+        elif cgst_val > 0 or sgst_val > 0:
+            gst_type = "Intra-State"
+        else:
+            gst_type = "Unknown"
+
+        # The analyzed bill, its products and the status change are saved together
+        with transaction.atomic():
+            # Create VendorAnalyzedBill entry
+            analyzed_bill = TallyVendorAnalyzedBill.objects.create(
+                selectBill=bill,
+                vendor=vendor,
+                bill_no=invoice_number,
+                bill_date=date_issued,
+                igst=igst_val,
+                cgst=cgst_val,
+                sgst=sgst_val,
+                total=relevant_data.get('total', 0),
+                note="AI Analyzed Bill",
+                team=bill.team,
+                gst_type=gst_type
+            )
+
+            # Bulk create VendorAnalyzedProduct entries
+            product_instances = [
+                TallyVendorAnalyzedProduct(
+                    vendor_bill_analyzed=analyzed_bill,
+                    item_details=item.get('description', ''),
+                    price=float(item.get('price', 0) or 0),
+                    quantity=int(item.get('quantity', 0) or 0),
+                    amount=float(item.get('price', 0) or 0) * int(item.get('quantity', 0) or 0),
+                    team=bill.team
+                ) for item in relevant_data.get('items', [])
+            ]
+            TallyVendorAnalyzedProduct.objects.bulk_create(product_instances)
+
+            # Update bill status
+            bill.status = "Analyzed"
+            bill.process = True
+            bill.save(update_fields=['status', 'process'])
+
+    except (KeyError, ValueError) as e:
+        logger.error(f"Data parsing error for Tally vendor bill {bill_id}: {e}")
+        release_bill(bill)
+    except Exception as e:
+        logger.error(f"Unexpected error for Tally vendor bill {bill_id}: {e}")
+        release_bill(bill)
+
+
+@shared_task
+def analyse_expense_bill(bill_id):
+    """
+    Analyzes a draft Tally expense bill using AI and creates its analyzed bill and products.
+    """
+    # Claim the bill before the slow model call so overlapping runs skip it
+    bill = claim_bill(TallyExpenseBill, bill_id)
+    if bill is None:
+        logger.info(f"Tally expense bill {bill_id} is not a draft or is already being analysed, skipping")
+        return
+
+    # AI Processing Request
+    try:
+        relevant_data = analyse_bill_file(bill.file, team_id=bill.team_id, content_hash=bill.content_hash)
+    except Exception as error:
+        logger.error(f"AI processing failed for Tally expense bill {bill_id}: {error}")
+        release_bill(bill)
+        return
+
+    # Save extracted data to the bill object
+    bill.analysed_data = relevant_data
+    bill.save(update_fields=['analysed_data'])
+
+    # Extract required fields safely
+    try:
+        invoice_number = relevant_data.get('invoiceNumber', '').strip()
+        date_issued = relevant_data.get('dateIssued', '')
+        date_issued = datetime.strptime(date_issued, '%Y-%m-%d').date() if date_issued else None
+
+        # The analyzed bill, its products and the status change are saved together
+        with transaction.atomic():
+            # Create ExpenseAnalyzedBill entry
+            analyzed_bill = TallyExpenseAnalyzedBill.objects.create(
+                selectBill=bill,
+                voucher=invoice_number,
+                bill_no=invoice_number,
+                bill_date=date_issued,
+                igst=str(float(relevant_data.get('igst', 0) or 0)),
+                cgst=str(float(relevant_data.get('cgst', 0) or 0)),
+                sgst=str(float(relevant_data.get('sgst', 0) or 0)),
+                total=str(float(relevant_data.get('total', 0) or 0)),
+                note="AI Analyzed Bill",
+                team=bill.team
+            )
+
+            # Bulk create ExpenseAnalyzedProduct entries
+            product_instances = []
+            for item in relevant_data.get('items', []):
+                price = float(item.get('price', 0) or 0)
+                quantity = float(item.get('quantity', 0) or 0)
+                amount = price * quantity
+
+                product_instances.append(
+                    TallyExpenseAnalyzedProduct(
+                        expense_bill=analyzed_bill,
+                        item_details=item.get('description', ''),
+                        amount=str(amount),  # Convert to string
+                        team=bill.team
+                    )
+                )
+            TallyExpenseAnalyzedProduct.objects.bulk_create(product_instances)
+
+            # Update bill status
+            bill.status = "Analyzed"
+            bill.process = True
+            bill.save(update_fields=['status', 'process'])
+
+    except (KeyError, ValueError) as e:
+        logger.error(f"Data parsing error for Tally expense bill {bill_id}: {e}")
+        release_bill(bill)
+    except Exception as e:
+        logger.error(f"Unexpected error for Tally expense bill {bill_id}: {e}")
+        release_bill(bill)
+
+
+@shared_task
+def analyse_vendor_bills(team_id, bill_ids=None):
+    """
+    Analyzes every draft Tally vendor bill of a team, or only bill_ids, with bounded concurrency.
+    Bills already being analysed by another run are skipped.
+    """
+    bills = claimable_bills(TallyVendorBill.objects.filter(team_id=team_id))
+    if bill_ids is not None:
+        bills = bills.filter(id__in=bill_ids)
+    analyse_bills_concurrently(analyse_vendor_bill, [str(bill_id) for bill_id in bills.values_list('id', flat=True)])
+
+
+@shared_task
+def analyse_expense_bills(team_id, bill_ids=None):
+    """
+    Analyzes every draft Tally expense bill of a team, or only bill_ids, with bounded concurrency.
+    Bills already being analysed by another run are skipped.
+    """
+    bills = claimable_bills(TallyExpenseBill.objects.filter(team_id=team_id))
+    if bill_ids is not None:
+        bills = bills.filter(id__in=bill_ids)
+    analyse_bills_concurrently(analyse_expense_bill, [str(bill_id) for bill_id in bills.values_list('id', flat=True)])
+
+
+@shared_task(bind=True)
+def split_vendor_bill_pdf(self, team_id, pdf_path, file_type):
+    """
+    Splits an uploaded multi-invoice PDF into Tally vendor bills, one per page, reporting per-page progress.
+    """
+    return create_page_bills(TallyVendorBill, team_id, pdf_path, file_type, ProgressRecorder(self))
+
+
+@shared_task(bind=True)
+def split_expense_bill_pdf(self, team_id, pdf_path, file_type):
+    """
+    Splits an uploaded multi-invoice PDF into Tally expense bills, one per page, reporting per-page progress.
+    """
+    return create_page_bills(TallyExpenseBill, team_id, pdf_path, file_type, ProgressRecorder(self))
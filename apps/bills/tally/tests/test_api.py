@@ -0,0 +1,149 @@
+import gzip
+import json
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.bills.tally.ledgers import get_sync_state
+from apps.bills.tally.models import (
+    Ledger, LedgerImport, TallyExpenseAnalyzedBill, TallyExpenseBill, TallyOutbox, TallyVendorAnalyzedBill,
+    TallyVendorBill
+)
+from apps.bills.tests.base import TEST_STORAGES
+from apps.teams.models import Team
+
+
+def ndjson(*entries):
+    return ''.join(json.dumps(entry) + '\n' for entry in entries).encode()
+
+
+def ledger_entry(master_id, alter_id, name, parent='Sundry Creditors'):
+    return {'Master_Id': master_id, 'Alter_Id': alter_id, 'Name': name, 'Parent': parent}
+
+
+class LedgerImportApiTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        response = self.client.post(reverse('tally:ledger_import_api', args=[self.team.slug]))
+        self.assertEqual(response.status_code, 201)
+        self.import_id = response.json()['id']
+
+    def put_batch(self, sequence, body, **headers):
+        url = reverse('tally:ledger_import_batch_api', args=[self.team.slug, self.import_id, sequence])
+        return self.client.put(url, data=body, content_type='application/x-ndjson', headers=headers)
+
+    def commit(self):
+        return self.client.post(reverse('tally:ledger_import_commit_api', args=[self.team.slug, self.import_id]))
+
+    def test_batches_are_applied_in_order_and_committed(self):
+        first = self.put_batch(1, ndjson(ledger_entry('1', 5, 'Acme'), ledger_entry('2', 7, 'Globex')))
+        second = self.put_batch(2, gzip.compress(ndjson(ledger_entry('3', 9, 'Initech'))), **{'Content-Encoding': 'gzip'})
+
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(second.json()['last_sequence'], 2)
+        self.assertEqual(second.json()['created'], 3)
+        self.assertEqual(Ledger.objects.filter(team=self.team).count(), 3)
+        # The AlterID mark only moves once the import is committed
+        self.assertEqual(get_sync_state(self.team).last_alter_id, 0)
+
+        response = self.commit()
+
+        self.assertEqual(response.json()['status'], 'Committed')
+        self.assertEqual(get_sync_state(self.team).last_alter_id, 9)
+
+    def test_resent_batch_is_acknowledged_without_being_applied(self):
+        self.put_batch(1, ndjson(ledger_entry('1', 5, 'Acme')))
+
+        response = self.put_batch(1, ndjson(ledger_entry('1', 6, 'Acme Renamed')))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Ledger.objects.get(team=self.team, master_id='1').name, 'Acme')
+
+    def test_out_of_order_batch_is_refused(self):
+        response = self.put_batch(2, ndjson(ledger_entry('1', 5, 'Acme')))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['last_sequence'], 0)
+        self.assertFalse(Ledger.objects.exists())
+
+    def test_invalid_line_rolls_the_batch_back(self):
+        response = self.put_batch(1, ndjson(ledger_entry('1', 5, 'Acme')) + b'{not json\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['last_sequence'], 0)
+        self.assertFalse(Ledger.objects.exists())
+
+    def test_batch_after_commit_is_refused(self):
+        self.put_batch(1, ndjson(ledger_entry('1', 5, 'Acme')))
+        self.commit()
+
+        response = self.put_batch(2, ndjson(ledger_entry('2', 6, 'Globex')))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(LedgerImport.objects.get(id=self.import_id).last_sequence, 1)
+
+    def test_abandoned_import_leaves_the_mark_alone(self):
+        self.put_batch(1, ndjson(ledger_entry('1', 5, 'Acme')))
+
+        response = self.client.get(reverse('tally:ledger_sync_state_api', args=[self.team.slug]))
+
+        self.assertEqual(response.json()['last_alter_id'], 0)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class TallyOutboxApiTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        self.analysed_bills = []
+        for number in range(3):
+            bill = TallyVendorBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'),
+                                                  status='Synced')
+            self.analysed_bills.append(TallyVendorAnalyzedBill.objects.create(team=self.team, selectBill=bill))
+            TallyOutbox.objects.create(team=self.team, vendor_bill=bill, payload={'id': str(number)})
+        expense_bill = TallyExpenseBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'),
+                                                       status='Synced')
+        TallyExpenseAnalyzedBill.objects.create(team=self.team, selectBill=expense_bill)
+        TallyOutbox.objects.create(team=self.team, expense_bill=expense_bill, payload={'id': 'expense'})
+        self.url = reverse('tally:vendor_api', args=[self.team.slug])
+
+    def pull_all(self, url):
+        payloads = []
+        while url:
+            data = self.client.get(url).json()
+            payloads += data['data']
+            url = data['next']
+        return payloads
+
+    def test_pages_cover_every_unacknowledged_bill_once(self):
+        payloads = self.pull_all(f"{self.url}?limit=2")
+
+        self.assertEqual(payloads, [{'id': '0'}, {'id': '1'}, {'id': '2'}])
+
+    def test_acknowledged_bills_are_not_pulled_again(self):
+        response = self.client.post(reverse('tally:vendor_ack_api', args=[self.team.slug]),
+                                    {'ids': [str(self.analysed_bills[0].id)]}, content_type='application/json')
+
+        self.assertEqual(response.json(), {'acknowledged': 1})
+        self.assertEqual(self.pull_all(self.url), [{'id': '1'}, {'id': '2'}])
+        # A full export still includes delivered bills
+        streamed = b''.join(self.client.get(f"{self.url}?stream=1").streaming_content)
+        self.assertEqual(len(streamed.splitlines()), 3)
+
+    def test_ack_only_touches_the_teams_bills_of_that_type(self):
+        other_team = Team.objects.create(name='Other', slug='other')
+        ids = [str(bill.id) for bill in self.analysed_bills]
+
+        other = self.client.post(reverse('tally:vendor_ack_api', args=[other_team.slug]), {'ids': ids},
+                                 content_type='application/json')
+        expense = self.client.post(reverse('tally:expense_ack_api', args=[self.team.slug]), {'ids': ids},
+                                   content_type='application/json')
+
+        self.assertEqual((other.json(), expense.json()), ({'acknowledged': 0}, {'acknowledged': 0}))
+        self.assertFalse(TallyOutbox.objects.filter(delivered_at__isnull=False).exists())
+
+    def test_ack_without_ids_is_rejected(self):
+        response = self.client.post(reverse('tally:vendor_ack_api', args=[self.team.slug]), {'ids': []},
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.bills.tally.ledgers import get_sync_state, ingest_ledgers
+from apps.bills.tally.models import Ledger, ParentLedger
+from apps.teams.models import Team
+
+
+def ledger_entry(master_id, alter_id, name, parent='Sundry Creditors', **extra):
+    return {'Master_Id': master_id, 'Alter_Id': alter_id, 'Name': name, 'Parent': parent, **extra}
+
+
+class IngestLedgersTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+
+    def test_repush_without_changes_touches_nothing(self):
+        ledgers = [ledger_entry('1', '10', 'Acme'), ledger_entry('2', '11', 'Globex')]
+        self.assertEqual(ingest_ledgers(self.team, ledgers), (2, 0, 0))
+        self.assertEqual(ingest_ledgers(self.team, ledgers), (0, 0, 2))
+        self.assertEqual(Ledger.objects.filter(team=self.team).count(), 2)
+
+    def test_changed_alter_id_updates_the_ledger(self):
+        ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme')])
+        self.assertEqual(ingest_ledgers(self.team, [ledger_entry('1', '12', 'Acme Ltd')]), (0, 1, 0))
+        self.assertEqual(Ledger.objects.get(team=self.team, master_id='1').name, 'Acme Ltd')
+
+    def test_deleted_entry_soft_deletes_the_ledger(self):
+        ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme')])
+        self.assertEqual(ingest_ledgers(self.team, [{'Master_Id': '1', 'Alter_Id': '15', 'Deleted': 'Yes'}]), (0, 1, 0))
+        ledger = Ledger.objects.get(team=self.team, master_id='1')
+        self.assertTrue(ledger.is_deleted)
+        self.assertEqual(ledger.alter_id, '15')
+
+    def test_entries_without_master_id_are_matched_on_name(self):
+        ledgers = [ledger_entry(None, None, 'Cash', parent='Cash-in-Hand')]
+        self.assertEqual(ingest_ledgers(self.team, ledgers), (1, 0, 0))
+        self.assertEqual(ingest_ledgers(self.team, ledgers), (0, 0, 1))
+        self.assertEqual(ingest_ledgers(self.team, [ledger_entry(None, None, 'Cash', parent='Bank')]), (0, 1, 0))
+        self.assertEqual(Ledger.objects.filter(team=self.team, name='Cash').count(), 1)
+
+    def test_null_parent_is_accepted(self):
+        self.assertEqual(ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme', parent=None)]), (1, 0, 0))
+        self.assertEqual(Ledger.objects.get(team=self.team).parent.parent, '')
+
+    def test_alter_id_mark_advances(self):
+        ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme'), ledger_entry('2', '42', 'Globex')])
+        ingest_ledgers(self.team, [ledger_entry('1', '12', 'Acme')])
+        self.assertEqual(get_sync_state(self.team).last_alter_id, 42)
+
+    def test_ledger_inserted_by_a_concurrent_push_is_not_counted_as_created(self):
+        bulk_create = Ledger.objects.bulk_create
+
+        def insert_after_another_push(ledgers, **kwargs):
+            parent = ParentLedger.objects.get(team=self.team, parent='Sundry Creditors')
+            Ledger.objects.create(team=self.team, parent=parent, master_id='1', alter_id='10', name='Acme')
+            return bulk_create(ledgers, **kwargs)
+
+        with mock.patch.object(Ledger.objects, 'bulk_create', side_effect=insert_after_another_push):
+            counts = ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme'), ledger_entry('2', '11', 'Globex')])
+
+        self.assertEqual(counts, (1, 0, 1))
+        self.assertEqual(Ledger.objects.filter(team=self.team, master_id='1').count(), 1)
+
+    def test_parent_inserted_by_a_concurrent_push_is_reused(self):
+        bulk_create = ParentLedger.objects.bulk_create
+
+        def insert_after_another_push(parents, **kwargs):
+            ParentLedger.objects.create(team=self.team, parent='Sundry Creditors')
+            return bulk_create(parents, **kwargs)
+
+        with mock.patch.object(ParentLedger.objects, 'bulk_create', side_effect=insert_after_another_push):
+            self.assertEqual(ingest_ledgers(self.team, [ledger_entry('1', '10', 'Acme')]), (1, 0, 0))
+
+        parent = ParentLedger.objects.get(team=self.team, parent='Sundry Creditors')
+        self.assertEqual(Ledger.objects.get(team=self.team, master_id='1').parent, parent)
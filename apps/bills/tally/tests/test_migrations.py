@@ -0,0 +1,93 @@
+import datetime
+
+from apps.bills.tests.base import MigrationTestCase
+
+
+class BackfillTallyOutboxTest(MigrationTestCase):
+    migrate_from = [('tally', '0014_tallyoutbox')]
+    migrate_to = [('tally', '0015_backfill_tally_outbox')]
+
+    def test_synced_bills_are_queued(self):
+        team = self.old_apps.get_model('teams', 'Team').objects.create(name='Team', slug='team')
+        TallyVendorBill = self.old_apps.get_model('tally', 'TallyVendorBill')
+        TallyVendorAnalyzedBill = self.old_apps.get_model('tally', 'TallyVendorAnalyzedBill')
+        TallyVendorAnalyzedProduct = self.old_apps.get_model('tally', 'TallyVendorAnalyzedProduct')
+        synced = TallyVendorBill.objects.create(team=team, file='bills/synced.jpg', status='Synced')
+        draft = TallyVendorBill.objects.create(team=team, file='bills/draft.jpg', status='Draft')
+        analysed_bill = TallyVendorAnalyzedBill.objects.create(team=team, selectBill=synced, bill_no='INV-1', total=118)
+        TallyVendorAnalyzedProduct.objects.create(team=team, vendor_bill_analyzed=analysed_bill, item_name='Paper',
+                                                  price=100, quantity=1, amount=100, product_gst='18%', igst=18)
+        TallyVendorAnalyzedBill.objects.create(team=team, selectBill=draft, bill_no='INV-2')
+
+        apps = self.migrate()
+        TallyOutbox = apps.get_model('tally', 'TallyOutbox')
+
+        outbox = TallyOutbox.objects.get()
+        self.assertEqual(outbox.vendor_bill_id, synced.id)
+        self.assertEqual(outbox.payload['bill_no'], 'INV-1')
+        self.assertEqual(outbox.payload['vendor']['name'], 'No Vendor')
+        self.assertEqual(outbox.payload['transactions'][0]['igst'], 18.0)
+
+
+class DedupeLedgersTest(MigrationTestCase):
+    migrate_from = [('tally', '0020_list_indexes')]
+    migrate_to = [('tally', '0022_ledger_unique_master_id')]
+
+    def test_duplicates_are_merged_into_one_ledger(self):
+        team = self.old_apps.get_model('teams', 'Team').objects.create(name='Team', slug='team')
+        parent = self.old_apps.get_model('tally', 'ParentLedger').objects.create(team=team, parent='Sundry Creditors')
+        Ledger = self.old_apps.get_model('tally', 'Ledger')
+        older = Ledger.objects.create(team=team, parent=parent, master_id='1', name='Acme')
+        newer = Ledger.objects.create(team=team, parent=parent, master_id='1', name='Acme Ltd')
+        Ledger.objects.filter(id=older.id).update(updated_at=newer.updated_at - datetime.timedelta(days=1))
+        Ledger.objects.create(team=team, parent=parent, master_id='', name='Cash')
+        Ledger.objects.create(team=team, parent=parent, master_id='', name='Bank')
+        bill = self.old_apps.get_model('tally', 'TallyVendorAnalyzedBill').objects.create(team=team, vendor=older)
+
+        apps = self.migrate()
+        Ledger = apps.get_model('tally', 'Ledger')
+
+        self.assertEqual(list(Ledger.objects.filter(master_id='1').values_list('id', flat=True)), [newer.id])
+        self.assertEqual(Ledger.objects.filter(master_id__isnull=True).count(), 2)
+        self.assertEqual(apps.get_model('tally', 'TallyVendorAnalyzedBill').objects.get(id=bill.id).vendor_id,
+                         newer.id)
+
+
+class SeedTallyBillSequencesTest(MigrationTestCase):
+    migrate_from = [('tally', '0018_ledger_delta_sync')]
+    migrate_to = [('tally', '0019_billsequence')]
+
+    def test_counters_start_after_the_highest_number_used(self):
+        Team = self.old_apps.get_model('teams', 'Team')
+        team, other_team = Team.objects.create(name='Team', slug='team'), Team.objects.create(name='Other', slug='other')
+        TallyVendorBill = self.old_apps.get_model('tally', 'TallyVendorBill')
+        for name in ('BM-TB-9', 'BM-TB-10', 'BM-TB-2', 'BM-TB-x'):
+            TallyVendorBill.objects.create(team=team, file='bills/x.jpg', billmunshiName=name)
+        TallyVendorBill.objects.create(team=other_team, file='bills/x.jpg', billmunshiName='BM-TB-3')
+        self.old_apps.get_model('tally', 'TallyExpenseBill').objects.create(team=team, file='bills/x.jpg',
+                                                                             billmunshiName='BM-TE-4')
+
+        apps = self.migrate()
+        counters = set(apps.get_model('tally', 'TallyBillSequence').objects.values_list('team_id', 'prefix',
+                                                                                        'last_number'))
+
+        self.assertEqual(counters, {(team.id, 'BM-TB-', 10), (other_team.id, 'BM-TB-', 3), (team.id, 'BM-TE-', 4)})
+
+
+class DedupeParentLedgersTest(MigrationTestCase):
+    migrate_from = [('tally', '0023_bill_analysis_started_at')]
+    migrate_to = [('tally', '0025_parentledger_unique_per_team')]
+
+    def test_duplicates_are_merged_into_the_oldest_parent(self):
+        team = self.old_apps.get_model('teams', 'Team').objects.create(name='Team', slug='team')
+        ParentLedger = self.old_apps.get_model('tally', 'ParentLedger')
+        older = ParentLedger.objects.create(team=team, parent='Sundry Creditors')
+        newer = ParentLedger.objects.create(team=team, parent='Sundry Creditors')
+        ParentLedger.objects.filter(id=older.id).update(created_at=newer.created_at - datetime.timedelta(days=1))
+        ledger = self.old_apps.get_model('tally', 'Ledger').objects.create(team=team, parent=newer, name='Acme')
+
+        apps = self.migrate()
+
+        ParentLedger = apps.get_model('tally', 'ParentLedger')
+        self.assertEqual(list(ParentLedger.objects.values_list('id', flat=True)), [older.id])
+        self.assertEqual(apps.get_model('tally', 'Ledger').objects.get(id=ledger.id).parent_id, older.id)
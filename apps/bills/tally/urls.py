@@ -16,6 +16,7 @@ urlpatterns = [
     path('vendor/bills/synced/', vendor.bill_synced, name='vendor_bill_synced'),  # Synced Bills
     # Vendor Actions
     path('vendor/bills/<str:bill_id>/analyze/', vendor.bill_analysis_process, name='vendor_bill_analysis_process'),
+    path('vendor/bills/analyze/', vendor.bill_bulk_analysis_process, name='vendor_bill_bulk_analysis_process'),
     path('vendor/bills/<str:bill_id>/verification/', vendor.bill_verification_process,
          name='vendor_bill_verification_process'),
     path('vendor/bills/<str:bill_id>/sync/', vendor.bill_sync_process,
@@ -38,6 +39,8 @@ urlpatterns = [
     # Expense Bill Actions
     path('expense/bills/<str:bill_id>/analyze/', expense.expense_bill_analysis_process,
          name='expense_bill_analysis_process'),
+    path('expense/bills/analyze/', expense.expense_bill_bulk_analysis_process,
+         name='expense_bill_bulk_analysis_process'),
     path('expense/bills/<str:bill_id>/verification/', expense.expense_bill_verification_process,
          name='expense_bill_verification_process'),
     path('expense/bills/<str:bill_id>/sync/', expense.expense_bill_sync_process, name='expense_bill_sync_process'),
@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from django.db.models import Value
+from django.db.models import Prefetch, Value
 from django.http import JsonResponse
 from apps.bills.tally.models import Ledger, ParentLedger
 from apps.teams.models import Team
@@ -9,7 +9,9 @@ from django.db.models.functions import Trim, Replace
 
 @login_and_team_required(login_url='account_login')
 def ledger(request, team_slug):
-    parent_ledger = ParentLedger.objects.filter(team=request.team).prefetch_related('ledger_set')
+    parent_ledger = ParentLedger.objects.filter(team=request.team).prefetch_related(
+        Prefetch('ledger_set', queryset=Ledger.objects.filter(is_deleted=False))
+    )
     context = {'allLedger': parent_ledger, "heading": "Tally Ledgers"}
     return render(request, 'tally/settings/ledgers.html', context)
 
@@ -0,0 +1,109 @@
+import base64
+import datetime
+from urllib.parse import parse_qsl
+
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.bills.listing import paginate_bills
+from apps.bills.tests.base import TEST_STORAGES
+from apps.bills.zoho.models import VendorBill
+from apps.teams import roles
+from apps.teams.models import Membership, Team
+from apps.users.models import CustomUser
+
+
+
+def encode_cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+@override_settings(STORAGES=TEST_STORAGES, BILL_LIST_PAGE_SIZE=3)
+class PaginateBillsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = Team.objects.create(name='Team', slug='team')
+        now = timezone.now()
+        cls.bills = []
+        for days_ago in (0, 0, 0, 0, 1, 10, 30):
+            bill = VendorBill.objects.create(team=cls.team, file=ContentFile(b'bill', name='bill.jpg'))
+            VendorBill.objects.filter(id=bill.id).update(created_at=now - datetime.timedelta(days=days_ago))
+            cls.bills.append(bill)
+
+    def paginate(self, **params):
+        request = RequestFactory().get('/bills/', params)
+        return paginate_bills(request, VendorBill.objects.filter(team=self.team))
+
+    def test_pages_cover_every_bill_once_newest_first(self):
+        seen, query = [], {}
+        while True:
+            page, next_query, _ = self.paginate(**query)
+            seen.extend(page)
+            if next_query is None:
+                break
+            query = dict(parse_qsl(next_query))
+
+        self.assertEqual(len(seen), len(self.bills))
+        self.assertEqual({bill.id for bill in seen}, {bill.id for bill in self.bills})
+        created = [bill.created_at for bill in seen]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_date_range_and_search_filters(self):
+        since = (timezone.now() - datetime.timedelta(days=12)).date().isoformat()
+        until = (timezone.now() - datetime.timedelta(days=5)).date().isoformat()
+        page, next_query, filters = self.paginate(**{'from': since, 'to': until})
+        self.assertEqual([bill.id for bill in page], [self.bills[5].id])
+        self.assertIsNone(next_query)
+        self.assertEqual(filters['from'], since)
+
+        page, _, _ = self.paginate(q=self.bills[6].billmunshiName)
+        self.assertEqual([bill.id for bill in page], [self.bills[6].id])
+
+    def test_bad_input_is_ignored(self):
+        first_page = [bill.id for bill in self.paginate()[0]]
+        bad_inputs = [
+            {'from': '2024-02-31'},
+            {'to': 'yesterday'},
+            {'to': '9999-12-31'},
+            {'from': '0001-01-01'},
+            {'cursor': 'not base64!'},
+            {'cursor': encode_cursor('2024-13-45T99:00:00+00:00|' + str(self.bills[0].id))},
+            {'cursor': encode_cursor(timezone.now().isoformat() + '|not-a-uuid')},
+            {'cursor': encode_cursor('2024-01-01T00:00:00|' + str(self.bills[0].id))},
+            {'cursor': encode_cursor('no separator')},
+        ]
+        for params in bad_inputs:
+            with self.subTest(params=params):
+                page, _, _ = self.paginate(**params)
+                self.assertEqual([bill.id for bill in page], first_page)
+
+
+@override_settings(STORAGES=TEST_STORAGES, BILL_LIST_PAGE_SIZE=2)
+class BillListViewTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        user = CustomUser.objects.create_user(username='owner@example.com', password='12345')
+        Membership.objects.create(team=self.team, user=user, role=roles.ROLE_ADMIN)
+        self.client.force_login(user)
+        for _ in range(3):
+            VendorBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'))
+        self.url = reverse('zoho:vendor_bill_list', args=[self.team.slug])
+
+    def test_full_page_then_htmx_rows(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['bills']), 2)
+        self.assertContains(response, 'Load more')
+
+        response = self.client.get(f"{self.url}?{response.context['next_query']}", HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['bills']), 1)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Load more')
+
+    def test_bad_filters_do_not_fail_the_page(self):
+        response = self.client.get(self.url, {'from': '2024-02-31', 'cursor': encode_cursor('x|y')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['bills']), 2)
@@ -0,0 +1,56 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from apps.bills.sequences import next_bill_number
+from apps.bills.tally.models import TallyBillSequence, TallyExpenseBill, TallyVendorBill
+from apps.bills.tests.base import TEST_STORAGES
+from apps.bills.zoho.models import ExpenseBill, VendorBill, ZohoBillSequence
+from apps.teams.models import Team
+
+
+class NextBillNumberTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+
+    def test_numbers_start_at_one_and_increase(self):
+        numbers = [next_bill_number(ZohoBillSequence, self.team.id, 'BM-ZV-') for _ in range(3)]
+
+        self.assertEqual(numbers, ['BM-ZV-1', 'BM-ZV-2', 'BM-ZV-3'])
+        self.assertEqual(ZohoBillSequence.objects.get(team=self.team, prefix='BM-ZV-').last_number, 3)
+
+    def test_numbering_continues_after_a_seeded_counter(self):
+        ZohoBillSequence.objects.create(team=self.team, prefix='BM-ZV-', last_number=41)
+
+        self.assertEqual(next_bill_number(ZohoBillSequence, self.team.id, 'BM-ZV-'), 'BM-ZV-42')
+
+    def test_counters_are_kept_per_team_and_prefix(self):
+        other_team = Team.objects.create(name='Other', slug='other')
+        next_bill_number(ZohoBillSequence, self.team.id, 'BM-ZV-')
+
+        self.assertEqual(next_bill_number(ZohoBillSequence, other_team.id, 'BM-ZV-'), 'BM-ZV-1')
+        self.assertEqual(next_bill_number(ZohoBillSequence, self.team.id, 'BM-ZE-'), 'BM-ZE-1')
+        self.assertEqual(next_bill_number(ZohoBillSequence, self.team.id, 'BM-ZV-'), 'BM-ZV-2')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BillNameTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+
+    def test_new_bills_are_numbered_from_their_own_counter(self):
+        ZohoBillSequence.objects.create(team=self.team, prefix='BM-ZV-', last_number=9)
+        bills = [
+            model.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'))
+            for model in (VendorBill, VendorBill, ExpenseBill, TallyVendorBill, TallyExpenseBill)
+        ]
+
+        self.assertEqual([bill.billmunshiName for bill in bills],
+                         ['BM-ZV-10', 'BM-ZV-11', 'BM-ZE-1', 'BM-TB-1', 'BM-TE-1'])
+        self.assertEqual(TallyBillSequence.objects.filter(team=self.team).count(), 2)
+
+    def test_a_given_name_is_kept(self):
+        bill = VendorBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'),
+                                         billmunshiName='Imported 7')
+
+        self.assertEqual(bill.billmunshiName, 'Imported 7')
+        self.assertFalse(ZohoBillSequence.objects.exists())
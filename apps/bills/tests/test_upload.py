@@ -0,0 +1,37 @@
+import uuid
+
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.teams import roles
+from apps.teams.models import Membership, Team
+from apps.users.models import CustomUser
+
+
+class BillUploadPageTest(TestCase):
+    url_names = ['zoho:vendor_bill_create', 'zoho:expense_bill_create', 'tally:vendor_bill_create',
+                 'tally:expense_bill_create']
+
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        user = CustomUser.objects.create_user(username='owner@example.com', password='12345')
+        Membership.objects.create(team=self.team, user=user, role=roles.ROLE_ADMIN)
+        self.client.force_login(user)
+
+    def test_progress_of_the_split_task_is_shown(self):
+        task_id = str(uuid.uuid4())
+        for url_name in self.url_names:
+            with self.subTest(url_name):
+                response = self.client.get(reverse(url_name, args=[self.team.slug]), {'task_id': task_id})
+
+                self.assertEqual(response.context['task_id'], task_id)
+                self.assertContains(response, reverse('celery_progress:task_status', args=[task_id]))
+
+    def test_malformed_task_id_is_ignored(self):
+        for url_name in self.url_names:
+            for task_id in ('a/b', 'not-a-task', ''):
+                with self.subTest(url_name, task_id=task_id):
+                    response = self.client.get(reverse(url_name, args=[self.team.slug]), {'task_id': task_id})
+
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIsNone(response.context['task_id'])
@@ -0,0 +1,35 @@
+from django.core.exceptions import ValidationError
+
+
+def posted_rows(data, count, fields, prefix='form'):
+    """
+    Reads the first `count` rows of a posted formset as dicts of the given fields.
+    """
+    return [{field: data.get(f"{prefix}-{index}-{field}") for field in fields} for index in range(count)]
+
+
+def clean_ids(model, ids):
+    """
+    Returns the posted ids that are valid primary keys of model, as strings; blank and malformed ids are left out.
+    """
+    pk_field = model._meta.pk
+    pks = []
+    for value in ids:
+        if not value:
+            continue
+        try:
+            pks.append(str(pk_field.to_python(value)))
+        except ValidationError:
+            continue
+    return pks
+
+
+def resolve_ids(queryset, ids):
+    """
+    Fetches the rows of queryset referenced by posted ids with a single in_bulk query.
+    Returns {str(pk): instance}; blank, malformed and unknown ids are left out.
+    """
+    pks = set(clean_ids(queryset.model, ids))
+    if not pks:
+        return {}
+    return {str(pk): instance for pk, instance in queryset.in_bulk(pks).items()}
@@ -9,9 +9,12 @@ admin.site.register(ZohoChartOfAccount)
 admin.site.register(ZohoCredentials)
 admin.site.register(ZohoTaxes)
 admin.site.register(ZohoTdsTcs)
+admin.site.register(ZohoSyncState)
+admin.site.register(ZohoSyncRecord)
 admin.site.register(VendorBill)
 admin.site.register(VendorAnalyzedBill)
 admin.site.register(VendorAnalyzedProduct)
 admin.site.register(ExpenseBill)
 admin.site.register(ExpenseAnalyzedBill)
 admin.site.register(ExpenseAnalyzedProduct)
+admin.site.register(ZohoBillSequence)
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ZOHO_TOKEN_URL = "https://accounts.zoho.in/oauth/v2/token"
+ZOHO_BOOKS_URL = "https://www.zohoapis.in/books/v3"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest Retry-After we honour for a throttled POST, in seconds
+MAX_RETRY_AFTER = 60
+
+_session = None
+_session_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_session():
+    """
+    Returns the process-wide Zoho session, whose keep-alive connections are reused across calls.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # POST is left out: Zoho may have acted on a write whose answer was lost, so
+                # writes are only resent on 429 by post() itself
+                retry = Retry(
+                    total=settings.ZOHO_MAX_RETRIES,
+                    backoff_factor=settings.ZOHO_RETRY_BACKOFF,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({'GET', 'PUT', 'DELETE'}),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    max_retries=retry,
+                    pool_connections=settings.ZOHO_POOL_SIZE,
+                    pool_maxsize=settings.ZOHO_POOL_SIZE,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    """
+    Sends a request through the shared session with the configured connect/read timeouts.
+    """
+    kwargs.setdefault('timeout', (settings.ZOHO_CONNECT_TIMEOUT, settings.ZOHO_READ_TIMEOUT))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    """
+    Posts through the shared session. A POST is never retried after a timeout, a dropped connection
+    or a server error, since Zoho may already have created the record; only a 429, which Zoho
+    rejected outright, is sent again once its Retry-After delay has passed.
+    """
+    for attempt in range(settings.ZOHO_MAX_RETRIES + 1):
+        response = request('POST', url, **kwargs)
+        if response.status_code != 429 or attempt == settings.ZOHO_MAX_RETRIES:
+            return response
+        time.sleep(retry_after(response, attempt))
+
+
+def retry_after(response, attempt):
+    """
+    Returns the seconds to wait before resending a throttled request, from its Retry-After header
+    when Zoho sends one, otherwise with exponential back-off.
+    """
+    value = response.headers.get('Retry-After', '')
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = (parsedate_to_datetime(value) - timezone.now()).total_seconds()
+        except (TypeError, ValueError):
+            delay = settings.ZOHO_RETRY_BACKOFF * (2 ** attempt)
+    return min(max(delay, 0), MAX_RETRY_AFTER)
+
+
+def auth_headers(access_token):
+    return {'Authorization': f'Zoho-oauthtoken {access_token}'}
+
+
+def token_cache_key(team_id):
+    return f"zoho:access-token:{team_id}"
+
+
+def get_access_token(credentials, stale_token=None):
+    """
+    Returns a valid access token for the team, refreshing it shortly before it expires.
+
+    Workers share the token through the cache and only one of them refreshes it at a time;
+    the others wait for the new token. Pass stale_token after a 401 to force a refresh
+    unless another worker has already replaced that token.
+    """
+    cache_key = token_cache_key(credentials.team_id)
+    token = cache.get(cache_key)
+    if token and token != stale_token:
+        return token
+
+    if stale_token is None and credentials.accessToken and credentials.accessTokenExpiry:
+        remaining = (credentials.accessTokenExpiry - timezone.now()).total_seconds()
+        if remaining > settings.ZOHO_TOKEN_REFRESH_MARGIN:
+            cache.set(cache_key, credentials.accessToken, remaining - settings.ZOHO_TOKEN_REFRESH_MARGIN)
+            return credentials.accessToken
+
+    lock_key = f"zoho:access-token-lock:{credentials.team_id}"
+    if cache.add(lock_key, True, settings.ZOHO_TOKEN_LOCK_TIMEOUT):
+        try:
+            # Another worker may have refreshed between our cache read and taking the lock
+            token = cache.get(cache_key)
+            if token and token != stale_token:
+                return token
+            return refresh_access_token(credentials) or (None if stale_token else credentials.accessToken)
+        finally:
+            cache.delete(lock_key)
+
+    # Someone else is refreshing; wait for their token instead of hitting the token endpoint too
+    deadline = time.monotonic() + settings.ZOHO_TOKEN_LOCK_TIMEOUT
+    while time.monotonic() < deadline and cache.get(lock_key):
+        time.sleep(0.2)
+        token = cache.get(cache_key)
+        if token and token != stale_token:
+            return token
+
+    token = cache.get(cache_key)
+    if token and token != stale_token:
+        return token
+    return refresh_access_token(credentials) or (None if stale_token else credentials.accessToken)
+
+
+def refresh_access_token(credentials):
+    """
+    Exchanges the refresh token for a new access token and stores it. Returns None on failure.
+    """
+    params = {
+        "refresh_token": credentials.refreshToken,
+        "client_id": credentials.clientId,
+        "client_secret": credentials.clientSecret,
+        "grant_type": "refresh_token"
+    }
+    try:
+        response = post(ZOHO_TOKEN_URL, params=params)
+        api_response = response.json()
+    except (requests.RequestException, ValueError) as error:
+        logger.error(f"Zoho token refresh failed for team {credentials.team_id}: {error}")
+        return None
+
+    if response.status_code != 200 or "access_token" not in api_response:
+        logger.error(f"Zoho token refresh rejected for team {credentials.team_id}: {api_response}")
+        return None
+
+    store_access_token(credentials, api_response)
+    credentials.save(update_fields=['accessToken', 'accessTokenExpiry', 'updated_at'])
+    return credentials.accessToken
+
+
+def store_access_token(credentials, api_response):
+    """
+    Records a newly issued access token and its expiry on the credentials and in the shared cache.
+    The caller saves the credentials.
+    """
+    expires_in = int(api_response.get("expires_in", 3600))
+    credentials.accessToken = api_response["access_token"]
+    credentials.accessTokenExpiry = timezone.now() + timedelta(seconds=expires_in)
+    cache.set(token_cache_key(credentials.team_id), credentials.accessToken,
+              max(expires_in - settings.ZOHO_TOKEN_REFRESH_MARGIN, 1))
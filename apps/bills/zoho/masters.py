@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime
+
+from django.utils import timezone
+
+from apps.bills.zoho import client as zoho_client
+from apps.bills.zoho.client import ZOHO_BOOKS_URL
+from apps.bills.zoho.models import ZohoVendor, ZohoChartOfAccount, ZohoTaxes, ZohoTdsTcs, ZohoSyncState
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 200
+ZOHO_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def iter_pages(credentials, path, list_key, params=None):
+    """
+    Yields the records of each page of a Zoho Books list endpoint until Zoho reports no more pages.
+    """
+    params = {**(params or {}), 'organization_id': credentials.organisationId, 'per_page': PER_PAGE}
+    access_token = zoho_client.get_access_token(credentials)
+    page = 1
+    while True:
+        params['page'] = page
+        url = f"{ZOHO_BOOKS_URL}/{path}"
+        response = zoho_client.get(url, headers=zoho_client.auth_headers(access_token), params=params)
+        if response.status_code == 401:
+            access_token = zoho_client.get_access_token(credentials, stale_token=access_token)
+            response = zoho_client.get(url, headers=zoho_client.auth_headers(access_token), params=params)
+        response.raise_for_status()
+        parsed_data = response.json()
+
+        yield parsed_data.get(list_key, [])
+
+        if not parsed_data.get('page_context', {}).get('has_more_page'):
+            break
+        page += 1
+
+
+def sync_vendors(credentials):
+    """
+    Upserts the vendors modified in Zoho since the last sync. Returns the number of vendors saved.
+    """
+    def build(contact):
+        if contact.get("contact_type") != "vendor":
+            return None
+        return ZohoVendor(
+            contactId=contact["contact_id"],
+            companyName=contact.get("company_name") or contact.get("contact_name", ""),
+            gstNo=contact.get("gst_no", ""),
+            team_id=credentials.team_id
+        )
+
+    return _sync_master(
+        credentials, 'vendors', 'contacts', 'contacts', build,
+        unique_field='contactId', update_fields=['companyName', 'gstNo'], params={'contact_type': 'vendor'}
+    )
+
+
+def sync_chart_of_accounts(credentials):
+    """
+    Upserts the chart of accounts modified in Zoho since the last sync. Returns the number of accounts saved.
+    """
+    def build(account):
+        return ZohoChartOfAccount(
+            accountId=account["account_id"],
+            accountName=account["account_name"],
+            team_id=credentials.team_id
+        )
+
+    return _sync_master(
+        credentials, 'chart_of_accounts', 'chartofaccounts', 'chartofaccounts', build,
+        unique_field='accountId', update_fields=['accountName']
+    )
+
+
+def sync_taxes(credentials):
+    """
+    Upserts every tax from Zoho. Zoho has no modified-time filter for taxes, so each run reads all pages.
+    """
+    def build(tax):
+        return ZohoTaxes(
+            taxId=tax["tax_id"],
+            taxName=tax["tax_name"],
+            team_id=credentials.team_id
+        )
+
+    return _sync_master(
+        credentials, 'taxes', 'settings/taxes', 'taxes', build,
+        unique_field='taxId', update_fields=['taxName'], incremental=False
+    )
+
+
+def sync_tds_tcs(credentials):
+    """
+    Upserts every TDS and TCS tax from Zoho. Returns the number of taxes saved.
+    """
+    def builder(tax_type):
+        def build(tax):
+            return ZohoTdsTcs(
+                taxId=tax["tax_id"],
+                taxName=tax["tax_name"],
+                taxPercentage=tax.get("tax_percentage", 0),
+                taxType=tax_type,
+                team_id=credentials.team_id
+            )
+        return build
+
+    update_fields = ['taxName', 'taxPercentage', 'taxType']
+    return _sync_master(
+        credentials, 'tds_tcs', 'settings/taxes', 'taxes', builder("TDS"),
+        unique_field='taxId', update_fields=update_fields, params={'is_tds_request': 'true'}, incremental=False
+    ) + _sync_master(
+        credentials, 'tds_tcs', 'settings/taxes', 'taxes', builder("TCS"),
+        unique_field='taxId', update_fields=update_fields,
+        params={'is_tcs_request': 'true', 'filter_by': 'Taxes.All'}, incremental=False
+    )
+
+
+def _sync_master(credentials, resource, path, list_key, build, unique_field, update_fields, params=None,
+                 incremental=True):
+    """
+    Streams a Zoho list page by page and upserts each page, so memory stays bounded by the page size.
+    The sync state only moves forward once every page has been saved.
+    """
+    state, _ = ZohoSyncState.objects.get_or_create(team_id=credentials.team_id, resource=resource)
+
+    params = dict(params or {})
+    if incremental and state.last_modified_time:
+        params['last_modified_time'] = state.last_modified_time.strftime(ZOHO_TIME_FORMAT)
+
+    latest_modified = state.last_modified_time
+    saved = 0
+    for records in iter_pages(credentials, path, list_key, params):
+        instances = [instance for instance in map(build, records) if instance is not None]
+        if instances:
+            type(instances[0]).objects.bulk_create(
+                instances, update_conflicts=True, unique_fields=[unique_field], update_fields=update_fields
+            )
+            saved += len(instances)
+
+        for record in records:
+            modified = _parse_zoho_time(record.get("last_modified_time"))
+            if modified and (latest_modified is None or modified > latest_modified):
+                latest_modified = modified
+
+    state.last_modified_time = latest_modified if incremental else None
+    state.last_synced_at = timezone.now()
+    state.save(update_fields=['last_modified_time', 'last_synced_at', 'updated_at'])
+
+    logger.info(f"Synced {saved} Zoho {resource} for team {credentials.team_id}")
+    return saved
+
+
+def _parse_zoho_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, ZOHO_TIME_FORMAT)
+    except ValueError:
+        return None
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0005_remove_expenseanalyzedproduct_vendor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expensebill',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+    ]
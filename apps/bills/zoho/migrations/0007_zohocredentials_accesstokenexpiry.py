@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0006_bill_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zohocredentials',
+            name='accessTokenExpiry',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_alter_membership_unique_together_flag'),
+        ('zoho', '0007_zohocredentials_accesstokenexpiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZohoSyncState',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('resource', models.CharField(choices=[('vendors', 'Vendors'), ('chart_of_accounts', 'Chart of Accounts'), ('taxes', 'Taxes')], max_length=50)),
+                ('last_modified_time', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+            ],
+            options={
+                'verbose_name_plural': 'Zoho Sync States',
+                'constraints': [models.UniqueConstraint(fields=('team', 'resource'), name='unique_zoho_sync_state_per_team')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0008_zohosyncstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='zohosyncstate',
+            name='resource',
+            field=models.CharField(choices=[('vendors', 'Vendors'), ('chart_of_accounts', 'Chart of Accounts'), ('taxes', 'Taxes'), ('tds_tcs', 'TDS/TCS Taxes')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0009_alter_zohosyncstate_resource'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expensebill',
+            name='sync_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='sync_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_alter_membership_unique_together_flag'),
+        ('zoho', '0010_bill_sync_error'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZohoSyncRecord',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('idempotency_key', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('remote_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_response', models.JSONField(blank=True, default=dict, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expense_bill', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='zoho_sync_record', to='zoho.expensebill')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+                ('vendor_bill', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='zoho_sync_record', to='zoho.vendorbill')),
+            ],
+            options={
+                'verbose_name_plural': 'Zoho Sync Records',
+            },
+        ),
+    ]
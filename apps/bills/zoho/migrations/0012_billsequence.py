@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:20
+
+import re
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """
+    Starts each team's counter after the highest bill number it already used for each prefix.
+    """
+    ZohoBillSequence = apps.get_model('zoho', 'ZohoBillSequence')
+    for model_name, prefix in (('VendorBill', 'BM-ZV-'), ('ExpenseBill', 'BM-ZE-')):
+        pattern = re.compile(rf'{re.escape(prefix)}(\d+)$')
+        highest = {}
+        names = apps.get_model('zoho', model_name).objects.filter(
+            billmunshiName__startswith=prefix
+        ).values_list('team_id', 'billmunshiName')
+        for team_id, name in names.iterator():
+            match = pattern.match(name)
+            if match:
+                highest[team_id] = max(highest.get(team_id, 0), int(match.group(1)))
+
+        for team_id, last_number in highest.items():
+            ZohoBillSequence.objects.update_or_create(team_id=team_id, prefix=prefix,
+                                                      defaults={'last_number': last_number})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_alter_membership_unique_together_flag'),
+        ('zoho', '0011_zohosyncrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZohoBillSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('prefix', models.CharField(max_length=20)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.team', verbose_name='Team')),
+            ],
+            options={
+                'verbose_name_plural': 'Zoho Bill Sequences',
+                'constraints': [models.UniqueConstraint(fields=('team', 'prefix'), name='unique_zoho_bill_sequence_per_team')],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_alter_membership_unique_together_flag'),
+        ('zoho', '0012_billsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expensebill',
+            index=models.Index(fields=['team', 'status', '-created_at'], name='zoho_expensebill_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['team', 'status', '-created_at'], name='zoho_vendorbill_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zohovendor',
+            index=models.Index(models.F('team'), django.db.models.functions.text.Lower('companyName'), name='zoho_vendor_name_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0013_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expensebill',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
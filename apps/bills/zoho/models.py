@@ -1,8 +1,10 @@
-import re
 import uuid
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.db.models import Max
+from django.db.models.functions import Lower
+from apps.bills.files import compute_content_hash
+from apps.bills.sequences import next_bill_number
 from apps.teams.models import BaseTeamModel
 
 
@@ -18,6 +20,7 @@ class ZohoCredentials(BaseTeamModel):
     organisationId = models.CharField(max_length=100, default="Your organisationId")
     redirectUrl = models.CharField(max_length=200, default="Your Redirect URL")
     accessToken = models.CharField(max_length=200, null=True, blank=True)
+    accessTokenExpiry = models.DateTimeField(null=True, blank=True)
     refreshToken = models.CharField(max_length=200, null=True, blank=True)
     onboarding_status = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -46,6 +49,10 @@ class ZohoVendor(BaseTeamModel):
 
     class Meta:
         verbose_name_plural = "Zoho Vendors"
+        indexes = [
+            # Case-insensitive vendor matching during analysis
+            models.Index('team', Lower('companyName'), name='zoho_vendor_name_idx'),
+        ]
 
 
 ##### Zoho Chart of Accounts (COA)
@@ -106,6 +113,35 @@ class ZohoTdsTcs(BaseTeamModel):
         verbose_name_plural = "Zoho TDS and TCS Taxes"
 
 
+##### Zoho Sync State
+class ZohoSyncState(BaseTeamModel):
+    """
+    Tracks how far each Zoho master-data list has been synced for a team.
+    """
+    RESOURCE_CHOICES = (
+        ('vendors', 'Vendors'),
+        ('chart_of_accounts', 'Chart of Accounts'),
+        ('taxes', 'Taxes'),
+        ('tds_tcs', 'TDS/TCS Taxes'),
+    )
+
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    resource = models.CharField(choices=RESOURCE_CHOICES, max_length=50)
+    last_modified_time = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.team} - {self.resource}"
+
+    class Meta:
+        verbose_name_plural = "Zoho Sync States"
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'resource'], name='unique_zoho_sync_state_per_team')
+        ]
+
+
 ##### Zoho Vendor Credits
 class ZohoVendorCredits(BaseTeamModel):
     """
@@ -125,6 +161,27 @@ class ZohoVendorCredits(BaseTeamModel):
         verbose_name_plural = "Zoho Vendor Credits"
 
 
+##### Bill Number Sequence
+class ZohoBillSequence(BaseTeamModel):
+    """
+    Holds the last bill number handed out per team and prefix; see next_bill_number.
+    """
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    prefix = models.CharField(max_length=20)
+    last_number = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.team} - {self.prefix}{self.last_number}"
+
+    class Meta:
+        verbose_name_plural = "Zoho Bill Sequences"
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'prefix'], name='unique_zoho_bill_sequence_per_team')
+        ]
+
+
 ##### File Validator
 def validate_file_extension(value):
     """
@@ -159,13 +216,20 @@ class VendorBill(BaseTeamModel):
     file = models.FileField(upload_to='bills/', validators=[validate_file_extension])
     fileType = models.CharField(choices=BILL_TYPE, max_length=100, null=True, blank=True, default="Single Invoice/File")
     analysed_data = models.JSONField(default=dict, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
     status = models.CharField(max_length=10, choices=BILL_STATUS, default='Draft', blank=True)
+    sync_error = models.TextField(null=True, blank=True)
     process = models.BooleanField(default=False)
+    analysis_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Fixed typo: update_at -> updated_at
 
     class Meta:
         verbose_name_plural = 'Vendor Bills'
+        indexes = [
+            # Bill lists filter on team and status, newest first
+            models.Index(fields=['team', 'status', '-created_at'], name='zoho_vendorbill_list_idx'),
+        ]
 
     def __str__(self):
         return self.billmunshiName if self.billmunshiName else "Unnamed Bill"
@@ -175,15 +239,11 @@ class VendorBill(BaseTeamModel):
         Automatically generates a unique billmunshiName if not provided.
         """
         if not self.billmunshiName:
-            highest_bill = VendorBill.objects.filter(billmunshiName__startswith='BM-ZV-').order_by(
-                '-billmunshiName').first()
-            if highest_bill:
-                match = re.match(r'BM-ZV-(\d+)', highest_bill.billmunshiName)
-                next_number = int(match.group(1)) + 1 if match else 1
-            else:
-                next_number = 1
+            self.billmunshiName = next_bill_number(ZohoBillSequence, self.team_id, 'BM-ZV-')
 
-            self.billmunshiName = f'BM-ZV-{next_number}'
+        # Hash the uploaded file once so identical invoices can reuse earlier analysis
+        if self._state.adding and self.file and not self.content_hash:
+            self.content_hash = compute_content_hash(self.file)
 
         super().save(*args, **kwargs)
 
@@ -273,13 +333,20 @@ class ExpenseBill(BaseTeamModel):
     file = models.FileField(upload_to='bills/', validators=[validate_file_extension])
     fileType = models.CharField(choices=BILL_TYPE, max_length=100, null=True, blank=True, default="Single Invoice/File")
     analysed_data = models.JSONField(default=dict, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
     status = models.CharField(max_length=10, choices=BILL_STATUS, default='Draft', blank=True)
+    sync_error = models.TextField(null=True, blank=True)
     process = models.BooleanField(default=False)
+    analysis_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Expense Bills"
+        indexes = [
+            # Bill lists filter on team and status, newest first
+            models.Index(fields=['team', 'status', '-created_at'], name='zoho_expensebill_list_idx'),
+        ]
 
     def __str__(self):
         return self.billmunshiName if self.billmunshiName else "Unnamed Expense Bill"
@@ -289,15 +356,11 @@ class ExpenseBill(BaseTeamModel):
         Automatically generates a unique billmunshiName if not provided.
         """
         if not self.billmunshiName:
-            highest_bill = ExpenseBill.objects.filter(billmunshiName__startswith='BM-ZE-').order_by(
-                '-billmunshiName').first()
-            if highest_bill:
-                match = re.match(r'BM-ZE-(\d+)', highest_bill.billmunshiName)
-                next_number = int(match.group(1)) + 1 if match else 1
-            else:
-                next_number = 1
+            self.billmunshiName = next_bill_number(ZohoBillSequence, self.team_id, 'BM-ZE-')
 
-            self.billmunshiName = f'BM-ZE-{next_number}'
+        # Hash the uploaded file once so identical invoices can reuse earlier analysis
+        if self._state.adding and self.file and not self.content_hash:
+            self.content_hash = compute_content_hash(self.file)
 
         super().save(*args, **kwargs)
 
@@ -350,3 +413,27 @@ class ExpenseAnalyzedProduct(BaseTeamModel):
 
     def __str__(self):
         return self.expense_analyzed_bill.selectBill.billmunshiName if self.expense_analyzed_bill else "Unnamed Expense Product"
+
+
+##### Zoho Sync Record
+class ZohoSyncRecord(BaseTeamModel):
+    """
+    Records each bill's posting to Zoho so a retry never creates the same bill twice.
+    """
+    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    vendor_bill = models.OneToOneField(VendorBill, on_delete=models.CASCADE, null=True, blank=True,
+                                       related_name='zoho_sync_record')
+    expense_bill = models.OneToOneField(ExpenseBill, on_delete=models.CASCADE, null=True, blank=True,
+                                        related_name='zoho_sync_record')
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    remote_id = models.CharField(max_length=100, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_response = models.JSONField(default=dict, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Zoho Sync Records"
+
+    def __str__(self):
+        return self.remote_id if self.remote_id else f"Pending ({self.attempts} attempts)"
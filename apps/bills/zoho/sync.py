@@ -0,0 +1,259 @@
+import json
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from apps.bills.zoho import client as zoho_client
+from apps.bills.zoho.client import ZOHO_BOOKS_URL
+from apps.bills.zoho.models import (
+    VendorAnalyzedBill, VendorAnalyzedProduct, ExpenseAnalyzedBill, ExpenseAnalyzedProduct, ZohoSyncRecord
+)
+
+
+class ZohoSyncError(Exception):
+    """
+    Raised when a bill cannot be synced to Zoho; the message is shown to the user and stored on the bill.
+    """
+
+
+def get_vendor_bill_for_sync(bill_id):
+    """
+    Loads an analyzed vendor bill with its vendor, TDS/TCS and products' accounts and taxes in two queries.
+    """
+    return VendorAnalyzedBill.objects.select_related('selectBill', 'vendor', 'tds_tcs_id').prefetch_related(
+        Prefetch('products', queryset=VendorAnalyzedProduct.objects.select_related('chart_of_accounts', 'taxes'))
+    ).get(selectBill=bill_id)
+
+
+def get_expense_bill_for_sync(bill_id):
+    """
+    Loads an analyzed expense bill with its vendor and products' accounts in two queries.
+    """
+    return ExpenseAnalyzedBill.objects.select_related('selectBill', 'vendor').prefetch_related(
+        Prefetch('products', queryset=ExpenseAnalyzedProduct.objects.select_related('chart_of_accounts'))
+    ).get(selectBill=bill_id)
+
+
+def build_vendor_bill_payload(analysed_bill):
+    """
+    Builds the Zoho Books bill payload from a bill loaded by get_vendor_bill_for_sync.
+    """
+    vendor = analysed_bill.vendor
+    if vendor is None:
+        raise ZohoSyncError("The specified vendor does not exist.")
+
+    bill_data = {
+        "vendor_id": vendor.contactId,
+        "bill_number": analysed_bill.bill_no,
+        "gst_no": vendor.gstNo,
+        "date": analysed_bill.bill_date.strftime('%Y-%m-%d'),
+        "line_items": []
+    }
+
+    tds_tcs = analysed_bill.tds_tcs_id
+    if tds_tcs is not None:
+        if analysed_bill.is_tax == 'TDS':
+            bill_data['tds_tax_id'] = str(tds_tcs.taxId)
+        elif analysed_bill.is_tax == 'TCS':
+            bill_data['tcs_tax_id'] = str(tds_tcs.taxId)
+
+    for item in analysed_bill.products.all():
+        if item.chart_of_accounts is None:
+            raise ZohoSyncError("The specified chart of account does not exist.")
+        if item.taxes is None:
+            raise ZohoSyncError("The specified tax does not exist.")
+
+        line_item = {
+            "account_id": str(item.chart_of_accounts.accountId),
+            "rate": float(item.rate),
+            "quantity": float(item.quantity),
+            "discount": float(0.00),
+            "itc_eligibility": item.itc_eligibility,
+        }
+        if item.reverse_charge_tax_id:
+            line_item['reverse_charge_tax_id'] = item.taxes.taxId
+        else:
+            line_item['tax_id'] = item.taxes.taxId
+        bill_data["line_items"].append(line_item)
+
+    return bill_data
+
+
+def build_expense_journal_payload(analysed_bill):
+    """
+    Builds the Zoho Books journal payload from a bill loaded by get_expense_bill_for_sync.
+    Every line is booked against the bill's vendor.
+    """
+    vendor = analysed_bill.vendor
+    if vendor is None:
+        raise ZohoSyncError("Please select a vendor for this bill.")
+
+    bill_data = {
+        "reference_number": analysed_bill.bill_no,
+        "journal_date": analysed_bill.bill_date.strftime('%Y-%m-%d'),
+        "notes": analysed_bill.note,
+        "line_items": []
+    }
+
+    for item in analysed_bill.products.all():
+        if item.chart_of_accounts is None:
+            raise ZohoSyncError("The specified chart of account does not exist.")
+
+        bill_data["line_items"].append({
+            "description": item.item_details,
+            "account_id": str(item.chart_of_accounts.accountId),
+            "customer_id": str(vendor.contactId),
+            "amount": float(item.amount),
+            "debit_or_credit": item.debit_or_credit
+        })
+
+    return bill_data
+
+
+def sync_vendor_bill(bill_id, credentials):
+    """
+    Posts a vendor bill to Zoho Books and marks it Synced.
+    """
+    analysed_bill = get_vendor_bill_for_sync(bill_id)
+    _sync_bill(
+        analysed_bill, credentials, 'vendor_bill', 'bills', 'bill', 'bill_id', build_vendor_bill_payload,
+        lookup_params=lambda bill_data: {'bill_number': bill_data['bill_number'], 'vendor_id': bill_data['vendor_id']},
+        line_fields={'account_id': str, 'rate': float, 'quantity': float}
+    )
+
+
+def sync_expense_bill(bill_id, credentials):
+    """
+    Posts an expense bill to Zoho Books as a journal and marks it Synced.
+    """
+    analysed_bill = get_expense_bill_for_sync(bill_id)
+    _sync_bill(
+        analysed_bill, credentials, 'expense_bill', 'journals', 'journal', 'journal_id', build_expense_journal_payload,
+        lookup_params=lambda bill_data: {'reference_number': bill_data['reference_number'],
+                                         'date': bill_data['journal_date']},
+        line_fields={'account_id': str, 'amount': float, 'debit_or_credit': str}
+    )
+
+
+def _sync_bill(analysed_bill, credentials, record_field, path, response_key, id_key, build_payload, lookup_params,
+               line_fields):
+    """
+    Builds and posts the payload, recording every attempt in the bill's ZohoSyncRecord.
+
+    A bill Zoho already accepted is never posted again. When an earlier attempt ended without a
+    usable answer (a timeout, a crash), Zoho is searched for the bill first and a record with the
+    same line items is adopted instead of re-posting. On failure the bill keeps its status and
+    stores the reason in sync_error before ZohoSyncError is raised.
+    """
+    bill = analysed_bill.selectBill
+    lock_key = f"zoho:bill-sync-lock:{bill.pk}"
+    if not cache.add(lock_key, True, settings.ZOHO_BILL_SYNC_LOCK_TIMEOUT):
+        raise ZohoSyncError("This bill is already being synced.")
+
+    try:
+        record, _ = ZohoSyncRecord.objects.get_or_create(**{record_field: bill}, defaults={'team_id': bill.team_id})
+        try:
+            bill_data = build_payload(analysed_bill)
+
+            if not record.remote_id and record.attempts:
+                expected_lines = _line_items(bill_data, line_fields)
+                record.remote_id = find_in_zoho(
+                    credentials, path, response_key, id_key, lookup_params(bill_data),
+                    lambda remote: _line_items(remote, line_fields) == expected_lines
+                )
+
+            if not record.remote_id:
+                # Count the attempt before posting so an interrupted post is reconciled next time
+                record.attempts += 1
+                record.save(update_fields=['attempts', 'updated_at'])
+
+                response = post_to_zoho(credentials, path, bill_data)
+                record.last_response = _response_body(response)
+                if response.status_code == 201:
+                    record.remote_id = str(record.last_response.get(response_key, {}).get(id_key, '')) or None
+                record.save(update_fields=['remote_id', 'last_response', 'updated_at'])
+                if response.status_code != 201:
+                    raise ZohoSyncError(_error_message(response))
+            else:
+                record.save(update_fields=['remote_id', 'updated_at'])
+        except (ZohoSyncError, requests.RequestException) as error:
+            bill.sync_error = str(error) if isinstance(error, ZohoSyncError) else f"Could not reach Zoho: {error}"
+            bill.save(update_fields=['sync_error', 'updated_at'])
+            raise ZohoSyncError(bill.sync_error) from error
+    finally:
+        cache.delete(lock_key)
+
+    bill.status = "Synced"
+    bill.sync_error = None
+    bill.save(update_fields=['status', 'sync_error', 'updated_at'])
+
+
+def find_in_zoho(credentials, path, response_key, id_key, params, is_same):
+    """
+    Returns the id of the Zoho record listed with params that is_same confirms is this bill, or None.
+
+    Each candidate is fetched in full so is_same can compare its line items; a record the team
+    entered by hand with the same number is not adopted unless its lines match. Raises ZohoSyncError
+    when several records match, as adopting either of them could be wrong.
+    """
+    access_token = zoho_client.get_access_token(credentials)
+    headers = zoho_client.auth_headers(access_token)
+    response = zoho_client.get(f"{ZOHO_BOOKS_URL}/{path}", headers=headers,
+                               params={**params, 'organization_id': credentials.organisationId})
+    response.raise_for_status()
+
+    matches = []
+    for candidate in response.json().get(path, []):
+        remote_id = str(candidate[id_key])
+        detail = zoho_client.get(f"{ZOHO_BOOKS_URL}/{path}/{remote_id}", headers=headers,
+                                 params={'organization_id': credentials.organisationId})
+        detail.raise_for_status()
+        if is_same(detail.json().get(response_key, {})):
+            matches.append(remote_id)
+
+    if len(matches) > 1:
+        raise ZohoSyncError("Several matching records already exist in Zoho; please check them before syncing again.")
+    return matches[0] if matches else None
+
+
+def _line_items(data, fields):
+    """
+    Returns the line items of a payload or a Zoho record as comparable tuples of the given fields,
+    each converted with its type so 100 and 100.0 compare equal.
+    """
+    try:
+        return sorted(
+            tuple(convert(item.get(field)) for field, convert in fields.items())
+            for item in data.get('line_items', [])
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def post_to_zoho(credentials, path, data):
+    """
+    Posts data to a Zoho Books endpoint, refreshing the token once if Zoho answers 401.
+    """
+    url = f"{ZOHO_BOOKS_URL}/{path}?organization_id={credentials.organisationId}"
+    payload = json.dumps(data)
+    access_token = zoho_client.get_access_token(credentials)
+    response = zoho_client.post(url, headers=zoho_client.auth_headers(access_token), data=payload)
+    if response.status_code == 401:
+        # Token was revoked before its recorded expiry
+        access_token = zoho_client.get_access_token(credentials, stale_token=access_token)
+        if access_token:
+            response = zoho_client.post(url, headers=zoho_client.auth_headers(access_token), data=payload)
+    return response
+
+
+def _response_body(response):
+    try:
+        return response.json()
+    except ValueError:
+        return {"status_code": response.status_code, "text": response.text[:2000]}
+
+
+def _error_message(response):
+    return _response_body(response).get("message") or f"Failed to send data to Zoho (HTTP {response.status_code})"
@@ -0,0 +1,292 @@
+import logging
+import random
+from datetime import datetime
+from decimal import Decimal
+
+from celery import shared_task
+from celery_progress.backend import ProgressRecorder
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from apps.bills.analysis import (
+    analyse_bill_file, analyse_bills_concurrently, claim_bill, claimable_bills, release_bill
+)
+from apps.bills.concurrency import run_for_bills
+from apps.bills.pdf import create_page_bills
+from apps.bills.zoho import client as zoho_client
+from apps.bills.zoho.masters import sync_vendors, sync_chart_of_accounts, sync_taxes, sync_tds_tcs
+from apps.bills.zoho.sync import sync_vendor_bill, sync_expense_bill
+from apps.bills.zoho.models import (
+    VendorBill, VendorAnalyzedBill, VendorAnalyzedProduct, ExpenseBill, ExpenseAnalyzedBill,
+    ExpenseAnalyzedProduct, ZohoVendor, ZohoCredentials
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def analyse_vendor_bill(bill_id):
+    """
+    Analyzes a draft vendor bill using AI and creates its analyzed bill and products.
+    """
+    # Claim the bill before the slow model call so overlapping runs skip it
+    bill = claim_bill(VendorBill, bill_id)
+    if bill is None:
+        logger.info(f"Vendor bill {bill_id} is not a draft or is already being analysed, skipping")
+        return
+
+    # AI Processing Request
+    try:
+        relevant_data = analyse_bill_file(bill.file, team_id=bill.team_id, content_hash=bill.content_hash)
+    except Exception as error:
+        logger.error(f"AI processing failed for vendor bill {bill_id}: {error}")
+        release_bill(bill)
+        return
+
+    # Save extracted data to the bill object
+    bill.analysed_data = relevant_data
+    bill.save(update_fields=['analysed_data'])
+
+    # Extract required fields safely
+    try:
+        invoice_number = relevant_data.get('invoiceNumber', '').strip()
+        date_issued = relevant_data.get('dateIssued', '')
+        company_name = relevant_data.get('from', {}).get('name', '').strip().lower()
+
+        date_issued = datetime.strptime(date_issued, '%Y-%m-%d').date() if date_issued else None
+
+        # Find vendor (case-insensitive search)
+        vendor = ZohoVendor.objects.annotate(lower_name=Lower('companyName')).filter(
+            team=bill.team, lower_name=company_name).first()
+
+        # The analyzed bill, its products and the status change are saved together
+        with transaction.atomic():
+            # Create VendorAnalyzedBill entry
+            analyzed_bill = VendorAnalyzedBill.objects.create(
+                selectBill=bill,
+                vendor=vendor,
+                bill_no=invoice_number,
+                bill_date=date_issued,
+                igst=relevant_data.get('igst', 0),
+                cgst=relevant_data.get('cgst', 0),
+                sgst=relevant_data.get('sgst', 0),
+                total=relevant_data.get('total', 0),
+                note="AI Analyzed Bill",
+                team=bill.team
+            )
+
+            # Bulk create VendorAnalyzedProduct entries
+            product_instances = [
+                VendorAnalyzedProduct(
+                    vendor_bill_analyzed=analyzed_bill,
+                    item_details=item.get('description', ''),
+                    rate=Decimal(item.get('price', 0) or 0),
+                    quantity=int(item.get('quantity', 0) or 0),
+                    amount=Decimal((item.get('price', 0) or 0) * (item.get('quantity', 0) or 0)),
+                    team=bill.team
+                ) for item in relevant_data.get('items', [])
+            ]
+            VendorAnalyzedProduct.objects.bulk_create(product_instances)
+
+            # Update bill status
+            bill.status = "Analyzed"
+            bill.process = True
+            bill.save(update_fields=['status', 'process'])
+
+    except (KeyError, ValueError) as e:
+        logger.error(f"Data parsing error for vendor bill {bill_id}: {e}")
+        release_bill(bill)
+    except Exception as e:
+        logger.error(f"Unexpected error for vendor bill {bill_id}: {e}")
+        release_bill(bill)
+
+
+@shared_task
+def analyse_expense_bill(bill_id):
+    """
+    Analyzes a draft expense bill using AI and creates its analyzed bill and products.
+    """
+    # Claim the bill before the slow model call so overlapping runs skip it
+    bill = claim_bill(ExpenseBill, bill_id)
+    if bill is None:
+        logger.info(f"Expense bill {bill_id} is not a draft or is already being analysed, skipping")
+        return
+
+    # AI Processing Request
+    try:
+        relevant_data = analyse_bill_file(bill.file, team_id=bill.team_id, content_hash=bill.content_hash)
+    except Exception as error:
+        logger.error(f"AI processing failed for expense bill {bill_id}: {error}")
+        release_bill(bill)
+        return
+
+    # Save extracted data to the bill object
+    bill.analysed_data = relevant_data
+    bill.save(update_fields=['analysed_data'])
+
+    # Extract required fields safely
+    try:
+        invoice_number = relevant_data.get('invoiceNumber', '').strip()
+        date_issued = relevant_data.get('dateIssued', '')
+        company_name = relevant_data.get('from', {}).get('name', '').strip().lower()
+
+        date_issued = datetime.strptime(date_issued, '%Y-%m-%d').date() if date_issued else None
+
+        # Find vendor (case-insensitive search)
+        vendor = ZohoVendor.objects.annotate(lower_name=Lower('companyName')).filter(
+            team=bill.team, lower_name=company_name).first()
+
+        # The analyzed bill, its products and the status change are saved together
+        with transaction.atomic():
+            # Create ExpenseAnalyzedBill entry
+            analyzed_bill = ExpenseAnalyzedBill.objects.create(
+                selectBill=bill,
+                vendor=vendor,
+                bill_no=invoice_number,
+                bill_date=date_issued,
+                igst=relevant_data.get('igst', 0),
+                cgst=relevant_data.get('cgst', 0),
+                sgst=relevant_data.get('sgst', 0),
+                total=relevant_data.get('total', 0),
+                note="AI Analyzed Bill",
+                team=bill.team
+            )
+
+            # Bulk create ExpenseAnalyzedProduct entries
+            product_instances = [
+                ExpenseAnalyzedProduct(
+                    expense_analyzed_bill=analyzed_bill,
+                    item_details=item.get('description', ''),
+                    amount=item.get('price', 0) * item.get('quantity', 0),
+                    team=bill.team
+                ) for item in relevant_data.get('items', [])
+            ]
+            ExpenseAnalyzedProduct.objects.bulk_create(product_instances)
+
+            # Update bill status
+            bill.status = "Analyzed"
+            bill.process = True
+            bill.save(update_fields=['status', 'process'])
+
+    except (KeyError, ValueError) as e:
+        logger.error(f"Data parsing error for expense bill {bill_id}: {e}")
+        release_bill(bill)
+    except Exception as e:
+        logger.error(f"Unexpected error for expense bill {bill_id}: {e}")
+        release_bill(bill)
+
+
+@shared_task
+def analyse_vendor_bills(team_id, bill_ids=None):
+    """
+    Analyzes every draft vendor bill of a team, or only bill_ids, with bounded concurrency.
+    Bills already being analysed by another run are skipped.
+    """
+    bills = claimable_bills(VendorBill.objects.filter(team_id=team_id))
+    if bill_ids is not None:
+        bills = bills.filter(id__in=bill_ids)
+    analyse_bills_concurrently(analyse_vendor_bill, [str(bill_id) for bill_id in bills.values_list('id', flat=True)])
+
+
+@shared_task
+def analyse_expense_bills(team_id, bill_ids=None):
+    """
+    Analyzes every draft expense bill of a team, or only bill_ids, with bounded concurrency.
+    Bills already being analysed by another run are skipped.
+    """
+    bills = claimable_bills(ExpenseBill.objects.filter(team_id=team_id))
+    if bill_ids is not None:
+        bills = bills.filter(id__in=bill_ids)
+    analyse_bills_concurrently(analyse_expense_bill, [str(bill_id) for bill_id in bills.values_list('id', flat=True)])
+
+
+@shared_task(bind=True)
+def split_vendor_bill_pdf(self, team_id, pdf_path, file_type):
+    """
+    Splits an uploaded multi-invoice PDF into vendor bills, one per page, reporting per-page progress.
+    """
+    return create_page_bills(VendorBill, team_id, pdf_path, file_type, ProgressRecorder(self))
+
+
+@shared_task(bind=True)
+def split_expense_bill_pdf(self, team_id, pdf_path, file_type):
+    """
+    Splits an uploaded multi-invoice PDF into expense bills, one per page, reporting per-page progress.
+    """
+    return create_page_bills(ExpenseBill, team_id, pdf_path, file_type, ProgressRecorder(self))
+
+
+@shared_task
+def refresh_master_data():
+    """
+    Queues a master-data sync for every team connected to Zoho, spread randomly over the jitter window.
+    """
+    team_ids = ZohoCredentials.objects.filter(onboarding_status=True).values_list('team_id', flat=True)
+    for team_id in team_ids:
+        sync_team_master_data.apply_async(
+            args=[team_id], countdown=random.uniform(0, settings.ZOHO_MASTER_SYNC_JITTER)
+        )
+
+
+@shared_task
+def sync_team_master_data(team_id):
+    """
+    Syncs vendors, chart of accounts, taxes and TDS/TCS from Zoho for one team.
+    Only one sync runs per team at a time; overlapping runs are skipped.
+    """
+    lock_key = f"zoho:master-sync-lock:{team_id}"
+    if not cache.add(lock_key, True, settings.ZOHO_MASTER_SYNC_LOCK_TIMEOUT):
+        logger.info(f"Zoho master-data sync already running for team {team_id}, skipping")
+        return
+
+    try:
+        credentials = ZohoCredentials.objects.filter(team_id=team_id).first()
+        if credentials is None:
+            return
+
+        for sync in (sync_vendors, sync_chart_of_accounts, sync_taxes, sync_tds_tcs):
+            try:
+                sync(credentials)
+            except Exception as error:
+                logger.error(f"Zoho {sync.__name__} failed for team {team_id}: {error}")
+    finally:
+        cache.delete(lock_key)
+
+
+@shared_task
+def sync_vendor_bills(team_id):
+    """
+    Pushes every verified vendor bill of a team to Zoho with bounded parallelism.
+    Failed bills stay Verified with the reason stored in sync_error.
+    """
+    return _sync_verified_bills(team_id, VendorBill, sync_vendor_bill)
+
+
+@shared_task
+def sync_expense_bills(team_id):
+    """
+    Pushes every verified expense bill of a team to Zoho with bounded parallelism.
+    Failed bills stay Verified with the reason stored in sync_error.
+    """
+    return _sync_verified_bills(team_id, ExpenseBill, sync_expense_bill)
+
+
+def _sync_verified_bills(team_id, bill_model, sync_bill):
+    credentials = ZohoCredentials.objects.filter(team_id=team_id).first()
+    if credentials is None:
+        logger.error(f"Zoho credentials not set for team {team_id}, skipping bulk sync")
+        return {'synced': 0, 'failed': 0}
+
+    bill_ids = [str(bill_id) for bill_id in
+                bill_model.objects.filter(team_id=team_id, status="Verified").values_list('id', flat=True)]
+
+    # Fetch the token once up front so the worker threads share it instead of each refreshing it
+    zoho_client.get_access_token(credentials)
+
+    def sync_to_zoho(bill_id):
+        sync_bill(bill_id, credentials)
+
+    failed = run_for_bills(sync_to_zoho, bill_ids, settings.ZOHO_SYNC_CONCURRENCY)
+    return {'synced': len(bill_ids) - len(failed), 'failed': len(failed)}
@@ -0,0 +1,55 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from apps.bills.zoho import client
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@override_settings(ZOHO_MAX_RETRIES=3, ZOHO_RETRY_BACKOFF=0.5)
+class ZohoPostTest(SimpleTestCase):
+    def test_session_never_retries_post(self):
+        retry = client.get_session().get_adapter('https://www.zohoapis.in').max_retries
+        self.assertNotIn('POST', retry.allowed_methods)
+        self.assertIn('GET', retry.allowed_methods)
+
+    @mock.patch('apps.bills.zoho.client.time.sleep')
+    @mock.patch('apps.bills.zoho.client.request')
+    def test_server_error_is_not_resent(self, request, sleep):
+        request.return_value = make_response(503)
+        response = client.post('https://example.com/bills', data='{}')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(request.call_count, 1)
+        sleep.assert_not_called()
+
+    @mock.patch('apps.bills.zoho.client.request')
+    def test_timeout_is_not_resent(self, request):
+        request.side_effect = requests.ReadTimeout()
+        with self.assertRaises(requests.ReadTimeout):
+            client.post('https://example.com/bills', data='{}')
+        self.assertEqual(request.call_count, 1)
+
+    @mock.patch('apps.bills.zoho.client.time.sleep')
+    @mock.patch('apps.bills.zoho.client.request')
+    def test_throttled_post_waits_for_retry_after(self, request, sleep):
+        request.side_effect = [make_response(429, {'Retry-After': '7'}), make_response(201)]
+        response = client.post('https://example.com/bills', data='{}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(request.call_count, 2)
+        sleep.assert_called_once_with(7.0)
+
+    @mock.patch('apps.bills.zoho.client.time.sleep')
+    @mock.patch('apps.bills.zoho.client.request')
+    def test_throttling_gives_up_after_max_retries(self, request, sleep):
+        request.return_value = make_response(429)
+        response = client.post('https://example.com/bills', data='{}')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(request.call_count, 4)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0, 2.0])
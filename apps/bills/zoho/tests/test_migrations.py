@@ -0,0 +1,22 @@
+from apps.bills.tests.base import MigrationTestCase
+
+
+class SeedZohoBillSequencesTest(MigrationTestCase):
+    migrate_from = [('zoho', '0011_zohosyncrecord')]
+    migrate_to = [('zoho', '0012_billsequence')]
+
+    def test_counters_start_after_the_highest_number_used(self):
+        Team = self.old_apps.get_model('teams', 'Team')
+        team, other_team = Team.objects.create(name='Team', slug='team'), Team.objects.create(name='Other', slug='other')
+        VendorBill = self.old_apps.get_model('zoho', 'VendorBill')
+        for name in ('BM-ZV-9', 'BM-ZV-10', 'BM-ZV-2', 'BM-ZV-x'):
+            VendorBill.objects.create(team=team, file='bills/x.jpg', billmunshiName=name)
+        VendorBill.objects.create(team=other_team, file='bills/x.jpg', billmunshiName='BM-ZV-3')
+        self.old_apps.get_model('zoho', 'ExpenseBill').objects.create(team=team, file='bills/x.jpg',
+                                                                      billmunshiName='BM-ZE-4')
+
+        apps = self.migrate()
+        counters = set(apps.get_model('zoho', 'ZohoBillSequence').objects.values_list('team_id', 'prefix',
+                                                                                       'last_number'))
+
+        self.assertEqual(counters, {(team.id, 'BM-ZV-', 10), (other_team.id, 'BM-ZV-', 3), (team.id, 'BM-ZE-', 4)})
@@ -0,0 +1,182 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from apps.bills.tests.base import TEST_STORAGES
+from apps.bills.zoho import client as zoho_client
+from apps.bills.zoho.models import (
+    ExpenseAnalyzedBill, ExpenseAnalyzedProduct, ExpenseBill, VendorBill, VendorAnalyzedBill, VendorAnalyzedProduct,
+    ZohoChartOfAccount, ZohoCredentials, ZohoSyncRecord, ZohoTaxes, ZohoVendor
+)
+from apps.bills.zoho.sync import ZohoSyncError, sync_expense_bill, sync_vendor_bill
+from apps.teams.models import Team
+
+
+def zoho_response(status_code, body):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=body), text='')
+
+
+BILL_LINES = [{'account_id': 'a1', 'rate': 100, 'quantity': 1, 'tax_id': 't1'}]
+JOURNAL_LINES = [{'account_id': 'a1', 'amount': 250, 'debit_or_credit': 'debit', 'customer_id': 'c1'}]
+
+
+def zoho_lookup(path, response_key, id_key, records):
+    """
+    Fakes zoho_client.get for a list endpoint returning `records` ({id: line_items}) and their detail endpoints.
+    """
+    def get(url, headers=None, params=None):
+        remote_id = url.rsplit('/', 1)[-1]
+        if remote_id == path:
+            get.list_params = params
+            return zoho_response(200, {path: [{id_key: record_id} for record_id in records]})
+        return zoho_response(200, {response_key: {id_key: remote_id, 'line_items': records[remote_id]}})
+    return get
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SyncVendorBillTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team', slug='team')
+        self.credentials = ZohoCredentials.objects.create(team=self.team, clientId='id', clientSecret='secret',
+                                                          organisationId='org')
+        self.bill = VendorBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'),
+                                              status='Verified')
+        analysed_bill = VendorAnalyzedBill.objects.create(
+            team=self.team, selectBill=self.bill, bill_no='INV-1', bill_date=datetime.date(2024, 5, 1),
+            vendor=ZohoVendor.objects.create(team=self.team, contactId='c1', companyName='Acme', gstNo='GST1')
+        )
+        VendorAnalyzedProduct.objects.create(
+            team=self.team, vendor_bill_analyzed=analysed_bill, rate=100, quantity=1,
+            chart_of_accounts=ZohoChartOfAccount.objects.create(team=self.team, accountId='a1', accountName='Stock'),
+            taxes=ZohoTaxes.objects.create(team=self.team, taxId='t1', taxName='GST 18')
+        )
+        token = mock.patch.object(zoho_client, 'get_access_token', return_value='token')
+        token.start()
+        self.addCleanup(token.stop)
+
+    def test_accepted_bill_is_marked_synced(self):
+        accepted = zoho_response(201, {'bill': {'bill_id': 'z1'}})
+        with mock.patch.object(zoho_client, 'post', return_value=accepted) as post, \
+                mock.patch.object(zoho_client, 'get') as get:
+            sync_vendor_bill(self.bill.id, self.credentials)
+
+        record = ZohoSyncRecord.objects.get(vendor_bill=self.bill)
+        self.assertIn('"bill_number": "INV-1"', post.call_args.kwargs['data'])
+        get.assert_not_called()
+        self.assertEqual((record.remote_id, record.attempts), ('z1', 1))
+        self.bill.refresh_from_db()
+        self.assertEqual((self.bill.status, self.bill.sync_error), ('Synced', None))
+
+    def test_failed_post_keeps_the_attempt_and_the_error(self):
+        with mock.patch.object(zoho_client, 'post', return_value=zoho_response(400, {'message': 'Invalid tax'})):
+            with self.assertRaisesMessage(ZohoSyncError, 'Invalid tax'):
+                sync_vendor_bill(self.bill.id, self.credentials)
+
+        record = ZohoSyncRecord.objects.get(vendor_bill=self.bill)
+        self.assertEqual((record.remote_id, record.attempts), (None, 1))
+        self.assertEqual(record.last_response, {'message': 'Invalid tax'})
+        self.bill.refresh_from_db()
+        self.assertEqual((self.bill.status, self.bill.sync_error), ('Verified', 'Invalid tax'))
+
+    def test_bill_found_after_an_interrupted_attempt_is_adopted(self):
+        ZohoSyncRecord.objects.create(team=self.team, vendor_bill=self.bill, attempts=1)
+        get = zoho_lookup('bills', 'bill', 'bill_id', {'z1': BILL_LINES})
+        with mock.patch.object(zoho_client, 'get', side_effect=get), mock.patch.object(zoho_client, 'post') as post:
+            sync_vendor_bill(self.bill.id, self.credentials)
+
+        self.assertEqual(get.list_params, {'bill_number': 'INV-1', 'vendor_id': 'c1', 'organization_id': 'org'})
+        post.assert_not_called()
+        record = ZohoSyncRecord.objects.get(vendor_bill=self.bill)
+        self.assertEqual((record.remote_id, record.attempts), ('z1', 1))
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Synced')
+
+    def test_bill_with_other_lines_is_not_adopted(self):
+        ZohoSyncRecord.objects.create(team=self.team, vendor_bill=self.bill, attempts=1)
+        other_lines = [{**BILL_LINES[0], 'rate': 90}]
+        get = zoho_lookup('bills', 'bill', 'bill_id', {'z1': other_lines})
+        with mock.patch.object(zoho_client, 'get', side_effect=get), \
+                mock.patch.object(zoho_client, 'post', return_value=zoho_response(201, {'bill': {'bill_id': 'z2'}})):
+            sync_vendor_bill(self.bill.id, self.credentials)
+
+        record = ZohoSyncRecord.objects.get(vendor_bill=self.bill)
+        self.assertEqual((record.remote_id, record.attempts), ('z2', 2))
+
+    def test_bill_missing_after_an_interrupted_attempt_is_posted_again(self):
+        ZohoSyncRecord.objects.create(team=self.team, vendor_bill=self.bill, attempts=1)
+        with mock.patch.object(zoho_client, 'get', side_effect=zoho_lookup('bills', 'bill', 'bill_id', {})), \
+                mock.patch.object(zoho_client, 'post', return_value=zoho_response(201, {'bill': {'bill_id': 'z2'}})):
+            sync_vendor_bill(self.bill.id, self.credentials)
+
+        record = ZohoSyncRecord.objects.get(vendor_bill=self.bill)
+        self.assertEqual((record.remote_id, record.attempts), ('z2', 2))
+
+    def test_synced_bill_is_never_posted_again(self):
+        ZohoSyncRecord.objects.create(team=self.team, vendor_bill=self.bill, attempts=1, remote_id='z1')
+        with mock.patch.object(zoho_client, 'get') as get, mock.patch.object(zoho_client, 'post') as post:
+            sync_vendor_bill(self.bill.id, self.credentials)
+
+        get.assert_not_called()
+        post.assert_not_called()
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Synced')
+
+    def test_ambiguous_match_is_not_adopted(self):
+        ZohoSyncRecord.objects.create(team=self.team, vendor_bill=self.bill, attempts=1)
+        found = zoho_lookup('bills', 'bill', 'bill_id', {'z1': BILL_LINES, 'z2': BILL_LINES})
+        with mock.patch.object(zoho_client, 'get', side_effect=found), \
+                mock.patch.object(zoho_client, 'post') as post:
+            with self.assertRaises(ZohoSyncError):
+                sync_vendor_bill(self.bill.id, self.credentials)
+
+        post.assert_not_called()
+        self.assertIsNone(ZohoSyncRecord.objects.get(vendor_bill=self.bill).remote_id)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SyncExpenseBillTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team', slug='team')
+        self.credentials = ZohoCredentials.objects.create(team=self.team, clientId='id', clientSecret='secret',
+                                                          organisationId='org')
+        self.bill = ExpenseBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'),
+                                               status='Verified')
+        analysed_bill = ExpenseAnalyzedBill.objects.create(
+            team=self.team, selectBill=self.bill, bill_no='EXP-1', bill_date=datetime.date(2024, 5, 1),
+            vendor=ZohoVendor.objects.create(team=self.team, contactId='c1', companyName='Acme', gstNo='GST1')
+        )
+        ExpenseAnalyzedProduct.objects.create(
+            team=self.team, expense_analyzed_bill=analysed_bill, item_details='Taxi', amount=250,
+            debit_or_credit='debit',
+            chart_of_accounts=ZohoChartOfAccount.objects.create(team=self.team, accountId='a1', accountName='Travel')
+        )
+        ZohoSyncRecord.objects.create(team=self.team, expense_bill=self.bill, attempts=1)
+        token = mock.patch.object(zoho_client, 'get_access_token', return_value='token')
+        token.start()
+        self.addCleanup(token.stop)
+
+    def test_journal_from_the_interrupted_attempt_is_adopted(self):
+        get = zoho_lookup('journals', 'journal', 'journal_id', {'j1': JOURNAL_LINES})
+        with mock.patch.object(zoho_client, 'get', side_effect=get), mock.patch.object(zoho_client, 'post') as post:
+            sync_expense_bill(self.bill.id, self.credentials)
+
+        self.assertEqual(get.list_params, {'reference_number': 'EXP-1', 'date': '2024-05-01', 'organization_id': 'org'})
+        post.assert_not_called()
+        self.assertEqual(ZohoSyncRecord.objects.get(expense_bill=self.bill).remote_id, 'j1')
+
+    def test_unrelated_journal_with_the_same_number_and_date_is_not_adopted(self):
+        # Entered by hand in Zoho against another account
+        other_lines = [{**JOURNAL_LINES[0], 'account_id': 'a2'}]
+        with mock.patch.object(zoho_client, 'get', side_effect=zoho_lookup('journals', 'journal', 'journal_id',
+                                                                           {'j1': other_lines})), \
+                mock.patch.object(zoho_client, 'post',
+                                  return_value=zoho_response(201, {'journal': {'journal_id': 'j2'}})) as post:
+            sync_expense_bill(self.bill.id, self.credentials)
+
+        post.assert_called_once()
+        self.assertEqual(ZohoSyncRecord.objects.get(expense_bill=self.bill).remote_id, 'j2')
@@ -0,0 +1,128 @@
+import datetime
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bills.zoho import tasks
+from apps.bills.zoho.models import VendorBill, VendorAnalyzedBill, VendorAnalyzedProduct
+from apps.bills.tests.base import TEST_STORAGES
+from apps.teams.models import Team
+
+
+ANALYSED_DATA = {
+    'invoiceNumber': 'INV-1',
+    'dateIssued': '2025-01-31',
+    'from': {'name': 'Acme'},
+    'total': 200,
+    'items': [{'description': 'Paper', 'price': 100, 'quantity': 2}],
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AnalyseVendorBillTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        self.bill = VendorBill.objects.create(team=self.team, file=ContentFile(b'bill', name='bill.jpg'))
+
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file', return_value=ANALYSED_DATA)
+    def test_creates_analyzed_bill_and_products(self, analyse_bill_file):
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Analyzed')
+        analyzed_bill = VendorAnalyzedBill.objects.get(selectBill=self.bill)
+        self.assertEqual(analyzed_bill.bill_no, 'INV-1')
+        self.assertEqual(VendorAnalyzedProduct.objects.filter(vendor_bill_analyzed=analyzed_bill).count(), 1)
+
+    def test_overlapping_run_is_skipped(self):
+        def analyse_while_another_run_starts(*args, **kwargs):
+            # A second click arrives while the model call is still running
+            tasks.analyse_vendor_bill(str(self.bill.id))
+            return ANALYSED_DATA
+
+        with mock.patch('apps.bills.zoho.tasks.analyse_bill_file',
+                        side_effect=analyse_while_another_run_starts) as analyse_bill_file:
+            tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.assertEqual(analyse_bill_file.call_count, 1)
+        self.assertEqual(VendorAnalyzedBill.objects.filter(selectBill=self.bill).count(), 1)
+
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file', return_value=ANALYSED_DATA)
+    def test_live_claim_is_respected(self, analyse_bill_file):
+        VendorBill.objects.filter(id=self.bill.id).update(process=True, analysis_started_at=timezone.now())
+
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        analyse_bill_file.assert_not_called()
+
+    @override_settings(BILL_ANALYSIS_CLAIM_TIMEOUT=60)
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file', return_value=ANALYSED_DATA)
+    def test_stale_claim_is_taken_over(self, analyse_bill_file):
+        # The worker holding the claim died without releasing it
+        VendorBill.objects.filter(id=self.bill.id).update(
+            process=True, analysis_started_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Analyzed')
+        self.assertTrue(VendorAnalyzedBill.objects.filter(selectBill=self.bill).exists())
+
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file', side_effect=RuntimeError('model unavailable'))
+    def test_failed_model_call_releases_the_claim(self, analyse_bill_file):
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Draft')
+        self.assertFalse(self.bill.process)
+        self.assertFalse(VendorAnalyzedBill.objects.filter(selectBill=self.bill).exists())
+
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file', return_value={**ANALYSED_DATA, 'dateIssued': '31/01/2025'})
+    def test_unparseable_result_saves_nothing(self, analyse_bill_file):
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Draft')
+        self.assertFalse(self.bill.process)
+        self.assertFalse(VendorAnalyzedBill.objects.exists())
+
+    @mock.patch('apps.bills.zoho.tasks.analyse_bill_file',
+                return_value={**ANALYSED_DATA, 'items': [{'description': 'Paper', 'price': 'n/a', 'quantity': 1}]})
+    def test_failure_after_the_analyzed_bill_is_rolled_back(self, analyse_bill_file):
+        tasks.analyse_vendor_bill(str(self.bill.id))
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, 'Draft')
+        self.assertFalse(VendorAnalyzedBill.objects.exists())
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AnalyseVendorBillsTest(TestCase):
+    @mock.patch('apps.bills.zoho.tasks.analyse_bills_concurrently')
+    def test_skips_bills_already_being_analysed(self, analyse_bills_concurrently):
+        team = Team.objects.create(name='Team', slug='team')
+        idle = VendorBill.objects.create(team=team, file=ContentFile(b'bill', name='bill.jpg'))
+        in_flight = VendorBill.objects.create(team=team, file=ContentFile(b'bill', name='bill.jpg'), process=True,
+                                              analysis_started_at=timezone.now())
+        VendorBill.objects.create(team=team, file=ContentFile(b'bill', name='bill.jpg'), status='Analyzed')
+
+        tasks.analyse_vendor_bills(team.id)
+
+        analyse, bill_ids = analyse_bills_concurrently.call_args.args
+        self.assertEqual(bill_ids, [str(idle.id)])
+        self.assertNotIn(str(in_flight.id), bill_ids)
+
+    @override_settings(BILL_ANALYSIS_CLAIM_TIMEOUT=60)
+    @mock.patch('apps.bills.zoho.tasks.analyse_bills_concurrently')
+    def test_picks_up_bills_with_a_stale_claim(self, analyse_bills_concurrently):
+        team = Team.objects.create(name='Team', slug='team')
+        abandoned = VendorBill.objects.create(team=team, file=ContentFile(b'bill', name='bill.jpg'), process=True,
+                                              analysis_started_at=timezone.now() - datetime.timedelta(minutes=5))
+
+        tasks.analyse_vendor_bills(team.id)
+
+        analyse, bill_ids = analyse_bills_concurrently.call_args.args
+        self.assertEqual(bill_ids, [str(abandoned.id)])
@@ -0,0 +1,40 @@
+import uuid
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.teams import roles
+from apps.teams.models import Membership, Team
+from apps.users.models import CustomUser
+
+
+class BulkAnalysisViewTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team', slug='team')
+        user = CustomUser.objects.create_user(username='owner@example.com', password='12345')
+        Membership.objects.create(team=self.team, user=user, role=roles.ROLE_ADMIN)
+        self.client.force_login(user)
+        self.url = reverse('zoho:vendor_bill_bulk_analysis_process', args=[self.team.slug])
+
+    @mock.patch('apps.bills.zoho.views.vendor.analyse_vendor_bills')
+    def test_malformed_ids_are_dropped(self, analyse_vendor_bills):
+        bill_id = str(uuid.uuid4())
+
+        self.client.post(self.url, {'scope': 'selected', 'bill_ids': [bill_id, 'not-a-uuid', '']})
+
+        analyse_vendor_bills.delay.assert_called_once_with(self.team.id, [bill_id])
+
+    @mock.patch('apps.bills.zoho.views.vendor.analyse_vendor_bills')
+    def test_nothing_is_queued_without_a_valid_id(self, analyse_vendor_bills):
+        response = self.client.post(self.url, {'scope': 'selected', 'bill_ids': ['1; DROP TABLE']})
+
+        self.assertRedirects(response, reverse('zoho:vendor_bill_drafts', args=[self.team.slug]),
+                             fetch_redirect_response=False)
+        analyse_vendor_bills.delay.assert_not_called()
+
+    @mock.patch('apps.bills.zoho.views.vendor.analyse_vendor_bills')
+    def test_all_drafts_are_queued_without_a_selection(self, analyse_vendor_bills):
+        self.client.post(self.url, {'scope': 'all'})
+
+        analyse_vendor_bills.delay.assert_called_once_with(self.team.id, None)
@@ -15,10 +15,12 @@ urlpatterns = [
     path('vendor/bills/synced/', vendor.bill_synced, name='vendor_bill_synced'),  # Synced Bills
     # Vendor Actions
     path('vendor/bills/<str:bill_id>/analyze/', vendor.bill_analysis_process, name='vendor_bill_analysis_process'),
+    path('vendor/bills/analyze/', vendor.bill_bulk_analysis_process, name='vendor_bill_bulk_analysis_process'),
     path('vendor/bills/<str:bill_id>/verification/', vendor.bill_verification_process,
          name='vendor_bill_verification_process'),
     path('vendor/bills/<str:bill_id>/sync/', vendor.bill_sync_process,
          name='vendor_bill_sync_process'),
+    path('vendor/bills/sync/', vendor.bill_bulk_sync_process, name='vendor_bill_bulk_sync_process'),
     path('vendor/bill/<str:bill_id>/view/', vendor.view_bill, name='view_vendor_bill'),
     # Sync Bill Detail Page
     path('vendor/bills/sync/<str:bill_id>/detail/', vendor.synced_bill_detail, name='vendor_bills_sync_detail'),
@@ -36,9 +38,12 @@ urlpatterns = [
     # Expense Bill Actions
     path('expense/bills/<str:bill_id>/analyze/', expense.expense_bill_analysis_process,
          name='expense_bill_analysis_process'),
+    path('expense/bills/analyze/', expense.expense_bill_bulk_analysis_process,
+         name='expense_bill_bulk_analysis_process'),
     path('expense/bills/<str:bill_id>/verification/', expense.expense_bill_verification_process,
          name='expense_bill_verification_process'),
     path('expense/bills/<str:bill_id>/sync/', expense.expense_bill_sync_process, name='expense_bill_sync_process'),
+    path('expense/bills/sync/', expense.expense_bill_bulk_sync_process, name='expense_bill_bulk_sync_process'),
     # Expense Sync Bill Detail Page
     path('expense/bills/sync/<str:bill_id>/detail/', expense.expense_synced_bill_detail,
          name='expense_bills_sync_detail'),
@@ -1,32 +1,26 @@
 import os
-import json
-import base64
-from io import BytesIO
-import requests
 import logging
-from datetime import datetime
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_bytes
 from django.conf import settings
 from django.contrib import messages
-from django.core.files.base import ContentFile
-from django.db.models.functions import Lower
 from django.db.models import Q
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
-# OpenAI Import
-from openai import OpenAI
+from django.urls import reverse
 
+from apps.bills.images import delete_prepared_image
+from apps.bills.listing import render_bill_list
+from apps.bills.pdf import save_uploaded_pdf, split_task_id
+from apps.bills.verification import clean_ids
 from apps.teams.decorators import login_and_team_required
 from apps.bills.zoho.forms import (
     ExpenseBillForm, ExpenseAnalyzedBillForm, ExpenseAnalyzedProductForm, ExpenseProductFormSet
 )
 from apps.bills.zoho.models import (
-    ExpenseBill, ExpenseAnalyzedBill, ExpenseAnalyzedProduct, ZohoVendor,
-    ZohoChartOfAccount, ZohoTaxes, ZohoCredentials
+    ExpenseBill, ExpenseAnalyzedBill, ExpenseAnalyzedProduct, ZohoTaxes, ZohoCredentials
 )
+from apps.bills.zoho.sync import sync_expense_bill, ZohoSyncError
+from apps.bills.zoho.tasks import analyse_expense_bill, analyse_expense_bills, split_expense_bill_pdf, sync_expense_bills
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 logger = logging.getLogger(__name__)
 
 
@@ -36,9 +30,9 @@ def expense_bills(request, team_slug):
     """
     Retrieves all expense bills for the current team and displays them in the expense main page.
     """
-    bills = ExpenseBill.objects.filter(team=request.team).order_by('-created_at')
+    bills = ExpenseBill.objects.filter(team=request.team)
     context = {'bills': bills, 'heading': 'Expense Bills List'}
-    return render(request, 'zoho/expense/main.html', context)
+    return render_bill_list(request, 'zoho/expense/main.html', context, 'bills')
 
 
 # ✅ Create Expense Bill
@@ -60,35 +54,11 @@ def expense_bill_create(request, team_slug):
 
             # Handle PDF splitting for 'Multiple Invoice/File'
             if bill.fileType == 'Multiple Invoice/File' and bill.file.name.endswith('.pdf'):
-                try:
-                    bill.file.seek(0)  # Ensure file is at the beginning
-                    pdf_bytes = bill.file.read()  # Read the PDF once
-                    pdf = PdfReader(BytesIO(pdf_bytes))
-                    unique_id = datetime.now().strftime("%Y%m%d%H%M%S")
-                    for page_num in range(len(pdf.pages)):
-                        # Convert each PDF page to an image
-                        page_images = convert_from_bytes(pdf_bytes, first_page=page_num + 1, last_page=page_num + 1)
-
-                        if page_images:
-                            image_io = BytesIO()
-                            page_images[0].save(image_io, format='JPEG')
-                            image_io.seek(0)
-
-                            # Create separate VendorBill for each page
-                            ExpenseBill.objects.create(
-                                billmunshiName=f"BM-Page-{page_num + 1}-{unique_id}",
-                                file=ContentFile(image_io.read(), name=f"BM-Page-{page_num + 1}-{unique_id}.jpg"),
-                                fileType=bill.fileType,
-                                status=bill.status,
-                                team=request.team
-                            )
-
-                    messages.success(request, 'Bill uploaded and split successfully!')
-                    return redirect('zoho:expense_bill_list', team_slug=team_slug)
-
-                except Exception as e:
-                    messages.error(request, f'Error processing PDF: {str(e)}')
-                    return redirect('zoho:expense_bill_list', team_slug=team_slug)
+                # Split in the background; the upload page polls the task for per-page progress
+                pdf_path = save_uploaded_pdf(bill.file)
+                task = split_expense_bill_pdf.delay(request.team.id, pdf_path, bill.fileType)
+                messages.info(request, 'Bill uploaded. Its pages are being split into separate bills.')
+                return redirect(f"{reverse('zoho:expense_bill_create', args=[team_slug])}?task_id={task.id}")
 
             # Save bill for non-PDF uploads
             bill.save()
@@ -97,7 +67,8 @@ def expense_bill_create(request, team_slug):
     else:
         form = ExpenseBillForm()
 
-    return render(request, 'zoho/expense/bill_upload.html', {'form': form, 'heading': 'Create Vendor Bill'})
+    context = {'form': form, 'heading': 'Create Vendor Bill', 'task_id': split_task_id(request)}
+    return render(request, 'zoho/expense/bill_upload.html', context)
 
 
 # ✅ Delete Expense Bill
@@ -113,6 +84,7 @@ def expense_bill_delete(request, team_slug, bill_id):
         file_path = os.path.join(settings.MEDIA_ROOT, str(bill.file))
         if os.path.exists(file_path):
             os.remove(file_path)
+        delete_prepared_image(bill.file)
 
     # Delete the bill record from the database
     bill.delete()
@@ -129,7 +101,7 @@ def expense_bill_drafts(request, team_slug):
     """
     draft_bills = ExpenseBill.objects.filter(team=request.team, status="Draft")
     context = {'draft_bills': draft_bills, 'heading': 'Draft Expense Bills'}
-    return render(request, 'zoho/expense/draft.html', context)
+    return render_bill_list(request, 'zoho/expense/draft.html', context, 'draft_bills')
 
 
 # ✅ Analyzed Expense Bills
@@ -142,7 +114,7 @@ def expense_bill_analyzed(request, team_slug):
         Q(team=request.team) & (Q(status="Analyzed") | Q(status="Verified"))
     )
     context = {'analyzed_bills': analyzed_bills, 'heading': 'Analyzed Expense Bills'}
-    return render(request, 'zoho/expense/analyzed.html', context)
+    return render_bill_list(request, 'zoho/expense/analyzed.html', context, 'analyzed_bills')
 
 
 # ✅ Synced Expense Bills
@@ -153,7 +125,7 @@ def expense_bill_synced(request, team_slug):
     """
     synced_bills = ExpenseBill.objects.filter(team=request.team, status="Synced")
     context = {'synced_bills': synced_bills, 'heading': 'Synced Expense Bills'}
-    return render(request, 'zoho/expense/synced.html', context)
+    return render_bill_list(request, 'zoho/expense/synced.html', context, 'synced_bills')
 
 
 # ✅ View Bill
@@ -174,149 +146,31 @@ def view_bill(request, team_slug, bill_id):
 @login_and_team_required(login_url='account_login')
 def expense_bill_analysis_process(request, team_slug, bill_id):
     """
-    Analyzes and processes a vendor bill using AI.
+    Queues AI analysis of an expense bill; the bill moves to Analyzed once the worker finishes.
     """
     bill = get_object_or_404(ExpenseBill, id=bill_id)
+    analyse_expense_bill.delay(str(bill.id))
+    messages.info(request, 'Bill analysis started. It will appear under Analyzed once processing completes.')
+    return redirect('zoho:expense_bill_list', team_slug=team_slug)
 
-    # Read the file and convert to Base64
-    try:
-        with open(bill.file.path, 'rb') as f:
-            image_base64 = base64.b64encode(f.read()).decode('utf-8')
-    except Exception as error:
-        logger.error(f"Error reading bill file: {error}")
-        messages.warning(request, 'Error reading the bill file.')
-        return redirect('zoho:vendor_bill_list', team_slug=team_slug)
-
-    # JSON Schema for AI extraction
-    invoice_schema = {
-        "$schema": "http://json-schema.org/draft/2020-12/schema",
-        "title": "Invoice",
-        "description": "A simple invoice format",
-        "type": "object",
-        "properties": {
-            "invoiceNumber": {"type": "string"},
-            "dateIssued": {"type": "string", "format": "date"},
-            "dueDate": {"type": "string", "format": "date"},
-            "from": {"type": "object", "properties": {"name": {"type": "string"}, "address": {"type": "string"}}},
-            "to": {"type": "object", "properties": {"name": {"type": "string"}, "address": {"type": "string"}}},
-            "items": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "description": {"type": "string"},
-                        "quantity": {"type": "number"},
-                        "price": {"type": "number"}
-                    }
-                }
-            },
-            "total": {"type": "number"},
-            "igst": {"type": "number"},
-            "cgst": {"type": "number"},
-            "sgst": {"type": "number"}
-        }
-    }
-
-    # AI Processing Request
-    try:
-        response = client.chat.completions.create(
-            model='gpt-4o',
-            response_format={"type": "json_object"},
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text",
-                     "text": f"Extract invoice data in JSON format using this schema: {json.dumps(invoice_schema)}"},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-                ]
-            }],
-            max_tokens=1000
-        )
-        json_data = json.loads(response.choices[0].message.content)
-    except Exception as error:
-        logger.error(f"AI processing failed: {error}")
-        messages.warning(request, 'AI processing failed.')
-        return redirect('zoho:vendor_bill_list', team_slug=team_slug)
-
-    # Save extracted data to the bill object
-    try:
-        if "properties" in json_data:
-            relevant_data = {
-                "invoiceNumber": json_data["properties"]["invoiceNumber"]["const"],
-                "dateIssued": json_data["properties"]["dateIssued"]["const"],
-                "dueDate": json_data["properties"]["dueDate"]["const"],
-                "from": json_data["properties"]["from"]["properties"],
-                "to": json_data["properties"]["to"]["properties"],
-                "items": [{"description": item["description"]["const"], "quantity": item["quantity"]["const"],
-                           "price": item["price"]["const"]} for item in json_data["properties"]["items"]["items"]],
-                "total": json_data["properties"]["total"]["const"],
-                "igst": json_data["properties"]["igst"]["const"],
-                "cgst": json_data["properties"]["cgst"]["const"],
-                "sgst": json_data["properties"]["sgst"]["const"],
-            }
-        else:
-            relevant_data = json_data
-        bill.analysed_data = relevant_data
-        bill.save(update_fields=['analysed_data'])
-    except Exception as error:
-        logger.error(f"Error saving bill data: {error}")
-        messages.warning(request, 'Error saving Bill data.')
-        return redirect('zoho:expense_bill_list', team_slug=team_slug)
-
-    # Extract required fields safely
-    try:
-        invoice_number = relevant_data.get('invoiceNumber', '').strip()
-        date_issued = relevant_data.get('dateIssued', '')
-        company_name = relevant_data.get('from', {}).get('name', '').strip().lower()
-
-        date_issued = datetime.strptime(date_issued, '%Y-%m-%d').date() if date_issued else None
-
-        # Find vendor (case-insensitive search)
-        vendor = ZohoVendor.objects.annotate(lower_name=Lower('companyName')).filter(
-            lower_name=company_name).first()
-
-        # Create ExpenseAnalyzedBill entry
-        analyzed_bill = ExpenseAnalyzedBill.objects.create(
-            selectBill=bill,
-            vendor=vendor,
-            bill_no=invoice_number,
-            bill_date=date_issued,
-            igst=relevant_data.get('igst', 0),
-            cgst=relevant_data.get('cgst', 0),
-            sgst=relevant_data.get('sgst', 0),
-            total=relevant_data.get('total', 0),
-            note="AI Analyzed Bill",
-            team=request.team
-        )
-
-        # Bulk create ExpenseAnalyzedProduct entries
-        product_instances = [
-            ExpenseAnalyzedProduct(
-                expense_analyzed_bill=analyzed_bill,
-                item_details=item.get('description', ''),
-                amount=item.get('price', 0) * item.get('quantity', 0),
-                team=request.team
-            ) for item in relevant_data.get('items', [])
-        ]
-        ExpenseAnalyzedProduct.objects.bulk_create(product_instances)
-
-        # Update bill status
-        bill.status = "Analyzed"
-        bill.process = True
-        bill.save(update_fields=['status', 'process'])
-
-        messages.success(request, 'Bill analyzed and processed successfully!')
-
-    except (KeyError, ValueError) as e:
-        logger.error(f"Data parsing error: {e}")
-        messages.warning(request, f'Missing expected data: {e}')
-        return redirect('zoho:expense_bill_list', team_slug=team_slug)
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        messages.warning(request, f'An error occurred: {e}')
-        return redirect('zoho:expense_bill_list', team_slug=team_slug)
 
-    return redirect('zoho:expense_bill_list', team_slug=team_slug)
+# ✅ Bulk Analyze Expense Bills
+@login_and_team_required(login_url='account_login')
+def expense_bill_bulk_analysis_process(request, team_slug):
+    """
+    Queues AI analysis of all draft expense bills of the team, or only the selected ones.
+    """
+    if request.method == 'POST':
+        bill_ids = None
+        if request.POST.get('scope') == 'selected':
+            bill_ids = clean_ids(ExpenseBill, request.POST.getlist('bill_ids'))
+            if not bill_ids:
+                messages.warning(request, 'Select at least one bill to analyze.')
+                return redirect('zoho:expense_bill_drafts', team_slug=team_slug)
+
+        analyse_expense_bills.delay(request.team.id, bill_ids)
+        messages.info(request, 'Bulk analysis started. Bills will appear under Analyzed as they complete.')
+    return redirect('zoho:expense_bill_drafts', team_slug=team_slug)
 
 
 # ✅Verify Expense Bill
@@ -363,21 +217,6 @@ def expense_bill_verification_process(request, team_slug, bill_id):
     return render(request, 'zoho/expense/verify_bill.html', context)
 
 
-def refresh_zoho_access_token(currentToken):
-    refresh_token = currentToken.refreshToken
-    client_id = currentToken.clientId
-    client_secret = currentToken.clientSecret
-    url = f"https://accounts.zoho.in/oauth/v2/token?refresh_token={refresh_token}&client_id={client_id}&client_secret={client_secret}&grant_type=refresh_token"
-    response = requests.post(url)
-    if response.status_code == 200:
-        new_access_token = response.json().get('access_token')
-        currentToken.accessToken = new_access_token
-        currentToken.save()
-        return new_access_token
-    else:
-        return None
-
-
 # 🚀 Sync Expense Bill with Zoho
 @login_and_team_required(login_url='account_login')
 def expense_bill_sync_process(request, team_slug, bill_id):
@@ -385,70 +224,36 @@ def expense_bill_sync_process(request, team_slug, bill_id):
     Marks an expense bill as synced with Zoho.
     """
     try:
-        billSyncProcess = ExpenseAnalyzedBill.objects.get(selectBill=bill_id)
-        zoho_products = billSyncProcess.products.all()
-
-        vendorZohoId = ZohoVendor.objects.get(id=billSyncProcess.vendor_id)
-        bill_date_str = billSyncProcess.bill_date.strftime('%Y-%m-%d')  # Convert date to yyyy-mm-dd string
-
-        bill_data = {
-            "reference_number": billSyncProcess.bill_no,
-            "journal_date": bill_date_str,
-            "notes": billSyncProcess.note,
-            "line_items": []
-        }
-
-        for item in zoho_products:
-            line_item = {
-                "description": item.item_details,
-                "account_id": str(ZohoChartOfAccount.objects.get(accountName=item.chart_of_accounts).accountId),
-                "customer_id": str(ZohoVendor.objects.get(companyName=item.vendor).contactId),
-                "amount": float(item.amount),
-                "debit_or_credit": item.debit_or_credit
-            }
-            bill_data["line_items"].append(line_item)
-
         currentToken = ZohoCredentials.objects.get(team=request.team)
-        url = f"https://www.zohoapis.in/books/v3/journals?organization_id={currentToken.organisationId}"
-        payload = json.dumps(bill_data)
-        headers = {
-            'Authorization': f'Zoho-oauthtoken {currentToken.accessToken}',
-        }
-        response = requests.post(url, headers=headers, data=payload)
-        if response.status_code == 401:
-            new_access_token = refresh_zoho_access_token(currentToken)
-            if new_access_token:
-                headers['Authorization'] = f'Zoho-oauthtoken {new_access_token}'
-                response = requests.post(url, headers=headers, data=payload)
-
-        if response.status_code == 201:
-            billStatusUpdate = ExpenseBill.objects.get(id=bill_id)
-            billStatusUpdate.status = "Synced"
-            billStatusUpdate.save()
-            messages.success(request, "Bill Synced Successfully")
-            return redirect('zoho:expense_bill_synced', team_slug=team_slug)
-        else:
-            response_json = response.json()
-            error_message = response_json.get("message", "Failed to send data to Zoho")
-            messages.error(request, error_message)
-            return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
-
-    except ExpenseAnalyzedBill.DoesNotExist:
+        sync_expense_bill(bill_id, currentToken)
+    except (ExpenseBill.DoesNotExist, ExpenseAnalyzedBill.DoesNotExist):
         messages.error(request, "The specified bill does not exist.")
         return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
-    except ZohoVendor.DoesNotExist:
-        messages.error(request, "Please select vendor against Accounts Payable item.")
-        return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
-    except ZohoChartOfAccount.DoesNotExist:
-        messages.error(request, "The specified chart of account does not exist.")
-        return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
     except ZohoCredentials.DoesNotExist:
         messages.error(request, "The Zoho credentials are not set.")
         return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
+    except ZohoSyncError as error:
+        messages.error(request, str(error))
+        return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
     except Exception as e:
         messages.error(request, f"An error occurred: {e}")
         return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
 
+    messages.success(request, "Bill Synced Successfully")
+    return redirect('zoho:expense_bill_synced', team_slug=team_slug)
+
+
+# ✅ Bulk Sync Expense Bills
+@login_and_team_required(login_url='account_login')
+def expense_bill_bulk_sync_process(request, team_slug):
+    """
+    Queues a background sync of all verified expense bills of the team to Zoho.
+    """
+    if request.method == 'POST':
+        sync_expense_bills.delay(request.team.id)
+        messages.info(request, 'Bulk sync started. Bills will appear under Synced as Zoho accepts them.')
+    return redirect('zoho:expense_bill_analyzed', team_slug=team_slug)
+
 
 # ✅View Synced Bill in detail
 @login_and_team_required(login_url='account_login')
@@ -1,12 +1,14 @@
 import json
 
 import requests
-from allauth.mfa.webauthn.internal.auth import get_credentials
 from django.contrib import messages
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 
 from apps.teams.decorators import login_and_team_required
+from apps.bills.zoho import client as zoho_client
+from apps.bills.zoho.client import ZOHO_TOKEN_URL
+from apps.bills.zoho.masters import sync_vendors, sync_chart_of_accounts, sync_taxes, sync_tds_tcs
 from apps.bills.zoho.models import ZohoCredentials, ZohoVendor, ZohoChartOfAccount, ZohoTaxes, ZohoTdsTcs
 
 
@@ -85,7 +87,7 @@ def generate_token(request, team_slug):
         """Helper function to update tokens and save them."""
         api_response = response.json()
         if "access_token" in api_response:
-            credential_data.accessToken = api_response["access_token"]
+            zoho_client.store_access_token(credential_data, api_response)
             if "refresh_token" in api_response:
                 credential_data.refreshToken = api_response["refresh_token"]
                 credential_data.onboarding_status = True
@@ -93,8 +95,6 @@ def generate_token(request, team_slug):
             return True
         return False
 
-    base_url = "https://accounts.zoho.in/oauth/v2/token"
-
     if credential_data.onboarding_status:
         params = {
             "refresh_token": credential_data.refreshToken,
@@ -111,7 +111,7 @@ def generate_token(request, team_slug):
             "client_secret": credential_data.clientSecret
         }
 
-    response = requests.post(base_url, params)
+    response = zoho_client.post(ZOHO_TOKEN_URL, data=params)
 
     if update_token(response):
         messages.success(request,
@@ -132,43 +132,19 @@ def fetchVendor(request, team_slug):
         messages.error(request, "Zoho credentials not found.")
         return redirect('zoho:vendors', team_slug)
 
-    url = f"https://www.zohoapis.in/books/v3/contacts?organization_id={currentToken.organisationId}"
-    headers = {
-        'Authorization': f'Zoho-oauthtoken {currentToken.accessToken}',
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # Raise an HTTPError on bad response
-        parsed_data = response.json()
+        saved = sync_vendors(currentToken)
     except requests.RequestException:
-        messages.error(request, "Failed to fetch contacts from Zoho.")
+        messages.error(request, "Failed to fetch vendors from Zoho.")
         return redirect('zoho:vendors', team_slug)
     except json.JSONDecodeError:
-        messages.error(request, "Failed to parse contacts data.")
+        messages.error(request, "Failed to parse vendors data.")
         return redirect('zoho:vendors', team_slug)
 
-    contacts = parsed_data.get("contacts", [])
-
-    existing_vendors = ZohoVendor.objects.filter(
-        contactId__in=[contact["contact_id"] for contact in contacts if contact["contact_type"] == "vendor"],
-        team=request.team
-    ).values_list('contactId', flat=True)
-    new_vendors = []
-    for contact in contacts:
-        if contact["contact_type"] == "vendor" and contact["contact_id"] not in existing_vendors:
-            new_vendors.append(ZohoVendor(
-                contactId=contact["contact_id"],
-                companyName=contact["company_name"],
-                gstNo=contact["gst_no"],
-                team=request.team
-            ))
-
-    if new_vendors:
-        ZohoVendor.objects.bulk_create(new_vendors)
-        messages.success(request, f"{len(new_vendors)} new vendors saved successfully.")
+    if saved:
+        messages.success(request, f"{saved} vendors synced successfully.")
     else:
-        messages.info(request, "No new vendors to save.")
+        messages.info(request, "No vendors changed since the last sync.")
 
     return redirect('zoho:vendors', team_slug)
 
@@ -181,15 +157,8 @@ def fetchChartAccount(request, team_slug):
         messages.error(request, "Zoho credentials not found.")
         return redirect('zoho:chartOfAccount', team_slug)
 
-    url = f"https://www.zohoapis.in/books/v3/chartofaccounts?organization_id={currentToken.organisationId}"
-    headers = {
-        'Authorization': f'Zoho-oauthtoken {currentToken.accessToken}',
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        parsed_data = response.json()
+        saved = sync_chart_of_accounts(currentToken)
     except requests.RequestException:
         messages.error(request, "Failed to fetch chart of accounts from Zoho.")
         return redirect('zoho:chartOfAccount', team_slug)
@@ -197,27 +166,10 @@ def fetchChartAccount(request, team_slug):
         messages.error(request, "Failed to parse chart of accounts data.")
         return redirect('zoho:chartOfAccount', team_slug)
 
-    chartOfAccounts = parsed_data.get("chartofaccounts", [])
-
-    existing_accounts = ZohoChartOfAccount.objects.filter(
-        accountId__in=[account["account_id"] for account in chartOfAccounts],
-        team=request.team
-    ).values_list('accountId', flat=True)
-
-    new_accounts = []
-    for account in chartOfAccounts:
-        if account["account_id"] not in existing_accounts:
-            new_accounts.append(ZohoChartOfAccount(
-                accountId=account["account_id"],
-                accountName=account["account_name"],
-                team=request.team
-            ))
-
-    if new_accounts:
-        ZohoChartOfAccount.objects.bulk_create(new_accounts)
-        messages.success(request, f"{len(new_accounts)} new chart of accounts saved successfully.")
+    if saved:
+        messages.success(request, f"{saved} chart of accounts synced successfully.")
     else:
-        messages.info(request, "No new chart of accounts to save.")
+        messages.info(request, "No chart of accounts changed since the last sync.")
 
     return redirect('zoho:chartOfAccount', team_slug)
 
@@ -230,15 +182,8 @@ def fetchTaxes(request, team_slug):
         messages.error(request, "Zoho credentials not found.")
         return redirect('zoho:taxes', team_slug)
 
-    url = f"https://www.zohoapis.in/books/v3/settings/taxes?organization_id={currentToken.organisationId}"
-    headers = {
-        'Authorization': f'Zoho-oauthtoken {currentToken.accessToken}',
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        parsed_data = response.json()
+        saved = sync_taxes(currentToken)
     except requests.RequestException:
         messages.error(request, "Failed to fetch taxes from Zoho.")
         return redirect('zoho:taxes', team_slug)
@@ -246,27 +191,10 @@ def fetchTaxes(request, team_slug):
         messages.error(request, "Failed to parse taxes data.")
         return redirect('zoho:taxes', team_slug)
 
-    zohoTax = parsed_data.get("taxes", [])
-
-    existing_taxes = ZohoTaxes.objects.filter(
-        taxId__in=[tax["tax_id"] for tax in zohoTax],
-        team=request.team
-    ).values_list('taxId', flat=True)
-
-    new_taxes = []
-    for tax in zohoTax:
-        if tax["tax_id"] not in existing_taxes:
-            new_taxes.append(ZohoTaxes(
-                taxId=tax["tax_id"],
-                taxName=tax["tax_name"],
-                team=request.team
-            ))
-
-    if new_taxes:
-        ZohoTaxes.objects.bulk_create(new_taxes)
-        messages.success(request, f"{len(new_taxes)} new taxes saved successfully.")
+    if saved:
+        messages.success(request, f"{saved} taxes synced successfully.")
     else:
-        messages.info(request, "No new taxes to save.")
+        messages.info(request, "No taxes changed since the last sync.")
 
     return redirect('zoho:taxes', team_slug)
 
@@ -279,81 +207,21 @@ def fetch_tds_tcs_tax(request, team_slug):
         messages.error(request, "Zoho credentials not found.")
         return redirect('zoho:tds_tcs_tax', team_slug)
 
-    headers = {
-        'Authorization': f'Zoho-oauthtoken {currentToken.accessToken}',
-    }
-
-    # Fetch and save TDS taxes
-    tds_url = f"https://www.zohoapis.in/books/v3/settings/taxes?is_tds_request=true&organization_id={currentToken.organisationId}"
-    try:
-        tds_response = requests.get(tds_url, headers=headers)
-        tds_response.raise_for_status()
-        tds_parsed_data = tds_response.json()
-    except requests.RequestException:
-        messages.error(request, "Failed to fetch TDS taxes from Zoho.")
-        return redirect('zoho:tds_tcs_tax', team_slug)
-    except json.JSONDecodeError:
-        messages.error(request, "Failed to parse TDS taxes data.")
-        return redirect('zoho:tds_tcs_tax', team_slug)
-
-    tds_taxes = tds_parsed_data.get("taxes", [])
-
-    existing_tds_taxes = ZohoTdsTcs.objects.filter(
-        taxId__in=[tax["tax_id"] for tax in tds_taxes],
-        taxType="TDS",
-        team=request.team
-    ).values_list('taxId', flat=True)
-
-    new_tds_taxes = []
-    for tax in tds_taxes:
-        if tax["tax_id"] not in existing_tds_taxes:
-            new_tds_taxes.append(ZohoTdsTcs(
-                taxId=tax["tax_id"],
-                taxName=tax["tax_name"],
-                taxPercentage=tax["tax_percentage"],
-                taxType="TDS",
-                team=request.team
-            ))
-    # Fetch and save TCS taxes
-    tcs_url = f"https://www.zohoapis.in/books/v3/settings/taxes?is_tcs_request=true&filter_by=Taxes.All&organization_id={currentToken.organisationId}"
     try:
-        tcs_response = requests.get(tcs_url, headers=headers)
-        tcs_response.raise_for_status()
-        tcs_parsed_data = tcs_response.json()
+        saved = sync_tds_tcs(currentToken)
     except requests.RequestException:
-        messages.error(request, "Failed to fetch TCS taxes from Zoho.")
+        messages.error(request, "Failed to fetch TDS/TCS taxes from Zoho.")
         return redirect('zoho:tds_tcs_tax', team_slug)
     except json.JSONDecodeError:
-        messages.error(request, "Failed to parse TCS taxes data.")
+        messages.error(request, "Failed to parse TDS/TCS taxes data.")
         return redirect('zoho:tds_tcs_tax', team_slug)
 
-    tcs_taxes = tcs_parsed_data.get("taxes", [])
-
-    existing_tcs_taxes = ZohoTdsTcs.objects.filter(
-        taxId__in=[tax["tax_id"] for tax in tcs_taxes],
-        taxType="TCS",
-        team=request.team
-    ).values_list('taxId', flat=True)
-
-    new_tcs_taxes = []
-    for tax in tcs_taxes:
-        if tax["tax_id"] not in existing_tcs_taxes:
-            new_tcs_taxes.append(ZohoTdsTcs(
-                taxId=tax["tax_id"],
-                taxName=tax["tax_name"],
-                taxPercentage=tax["tax_percentage"],
-                taxType="TCS",
-                team=request.team
-            ))
-
-    if new_tcs_taxes and new_tds_taxes:
-        ZohoTdsTcs.objects.bulk_create(new_tds_taxes)
-        ZohoTdsTcs.objects.bulk_create(new_tcs_taxes)
-        messages.success(request, " TDS/TCS taxes saved successfully.")
-        return redirect('zoho:tds_tcs_tax', team_slug)
+    if saved:
+        messages.success(request, f"{saved} TDS/TCS taxes synced successfully.")
     else:
-        messages.error(request, " TDS & TCS taxes not saved successfully.")
-        return redirect('zoho:tds_tcs_tax', team_slug)
+        messages.info(request, "No TDS/TCS taxes found in Zoho.")
+
+    return redirect('zoho:tds_tcs_tax', team_slug)
 
 
 @login_and_team_required(login_url='account_login')
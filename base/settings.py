@@ -1,5 +1,6 @@
 import os
 import sys
+from datetime import timedelta
 from pathlib import Path
 
 import environ
@@ -37,6 +38,7 @@ THIRD_PARTY_APPS = [
     "allauth.socialaccount.providers.google",
     "channels",
     "django_htmx",
+    "template_partials.apps.SimpleAppConfig",
     "django_otp",
     "django_otp.plugins.otp_totp",
     "django_otp.plugins.otp_static",
@@ -327,6 +329,20 @@ if REDIS_URL.startswith("rediss"):
 
 CELERY_BROKER_URL = CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULE = {
+    "refresh-zoho-master-data": {
+        "task": "apps.bills.zoho.tasks.refresh_master_data",
+        "schedule": timedelta(minutes=env.int("ZOHO_MASTER_SYNC_INTERVAL_MINUTES", default=60)),
+    },
+}
+
+# Shared cache so every web and worker process sees the same entries
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
 
 # Channels / Daphne setup
 ASGI_APPLICATION = "base.asgi.application"
@@ -382,6 +398,48 @@ LOGGING = {
 }
 
 OPENAI_API_KEY = env("OPENAI_API_KEY")
+# Retries done by the OpenAI client itself, then by our own rate-limit back-off
+OPENAI_MAX_RETRIES = env.int("OPENAI_MAX_RETRIES", default=2)
+OPENAI_RATE_LIMIT_RETRIES = env.int("OPENAI_RATE_LIMIT_RETRIES", default=5)
+
+# Bill processing
+BILL_ANALYSIS_CONCURRENCY = env.int("BILL_ANALYSIS_CONCURRENCY", default=4)
+# A draft claimed for analysis longer ago than this is assumed abandoned (e.g. the worker died) and reclaimed
+BILL_ANALYSIS_CLAIM_TIMEOUT = env.int("BILL_ANALYSIS_CLAIM_TIMEOUT", default=15 * 60)
+# Analysis results are cached per team and file content hash so duplicate uploads skip the model
+BILL_ANALYSIS_CACHE_TIMEOUT = env.int("BILL_ANALYSIS_CACHE_TIMEOUT", default=60 * 60 * 24 * 30)
+# PDF pages are rendered in chunks of BILL_PDF_CHUNK_SIZE to bound memory and temp disk usage
+BILL_PDF_DPI = env.int("BILL_PDF_DPI", default=200)
+BILL_PDF_THREAD_COUNT = env.int("BILL_PDF_THREAD_COUNT", default=2)
+BILL_PDF_CHUNK_SIZE = env.int("BILL_PDF_CHUNK_SIZE", default=20)
+# Bill images are cropped, downscaled and re-encoded as grayscale before being sent to the model
+BILL_IMAGE_MAX_SIZE = env.int("BILL_IMAGE_MAX_SIZE", default=2048)
+BILL_IMAGE_FORMAT = env("BILL_IMAGE_FORMAT", default="JPEG").upper()  # JPEG or WEBP
+BILL_IMAGE_QUALITY = env.int("BILL_IMAGE_QUALITY", default=80)
+# Bill list pages load this many rows at a time, more are fetched with "Load more"
+BILL_LIST_PAGE_SIZE = env.int("BILL_LIST_PAGE_SIZE", default=50)
+
+# Zoho Books API
+ZOHO_CONNECT_TIMEOUT = env.float("ZOHO_CONNECT_TIMEOUT", default=5)
+ZOHO_READ_TIMEOUT = env.float("ZOHO_READ_TIMEOUT", default=30)
+ZOHO_MAX_RETRIES = env.int("ZOHO_MAX_RETRIES", default=3)
+ZOHO_RETRY_BACKOFF = env.float("ZOHO_RETRY_BACKOFF", default=0.5)
+ZOHO_POOL_SIZE = env.int("ZOHO_POOL_SIZE", default=10)
+# Bills pushed to Zoho in parallel by the bulk sync; keep below Zoho's per-minute rate limit
+ZOHO_SYNC_CONCURRENCY = env.int("ZOHO_SYNC_CONCURRENCY", default=4)
+ZOHO_BILL_SYNC_LOCK_TIMEOUT = env.int("ZOHO_BILL_SYNC_LOCK_TIMEOUT", default=5 * 60)
+# Access tokens are refreshed this many seconds before Zoho expires them
+ZOHO_TOKEN_REFRESH_MARGIN = env.int("ZOHO_TOKEN_REFRESH_MARGIN", default=300)
+ZOHO_TOKEN_LOCK_TIMEOUT = env.int("ZOHO_TOKEN_LOCK_TIMEOUT", default=30)
+# Scheduled master-data syncs start at a random offset within the jitter window (seconds)
+ZOHO_MASTER_SYNC_JITTER = env.int("ZOHO_MASTER_SYNC_JITTER", default=600)
+ZOHO_MASTER_SYNC_LOCK_TIMEOUT = env.int("ZOHO_MASTER_SYNC_LOCK_TIMEOUT", default=30 * 60)
+
+# Tally connector pull API
+TALLY_PULL_PAGE_SIZE = env.int("TALLY_PULL_PAGE_SIZE", default=100)
+TALLY_PULL_MAX_PAGE_SIZE = env.int("TALLY_PULL_MAX_PAGE_SIZE", default=500)
+# Rows read per database round trip when streaming a full export
+TALLY_EXPORT_CHUNK_SIZE = env.int("TALLY_EXPORT_CHUNK_SIZE", default=500)
 
 APPEND_SLASH=False
 SERVER_URL = env("SERVER_URL")
\ No newline at end of file